@@ -0,0 +1,103 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 所有本地缓存的根目录，可通过环境变量覆盖
+CACHE_ROOT = os.getenv('ZEPHYR_AGENT_CACHE',
+                       os.path.join(os.path.expanduser('~'), '.cache', 'zephyr_agent'))
+
+
+def cache_path(*parts) -> str:
+    # 只拼接路径不创建目录：缓存目录不可写时读写按未命中处理，不影响命令本身
+    return os.path.join(CACHE_ROOT, *parts)
+
+
+def load_json(path: str, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path: str, data):
+    # 先写临时文件再替换，避免并发进程读到半截内容
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path: str, shared: bool = False):
+    # 基于flock的进程间锁；没有fcntl的平台上不加锁
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def is_locked(path: str) -> bool:
+    # 其他进程持有锁时返回True，不阻塞
+    if fcntl is None or not os.path.isfile(path):
+        return False
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return False
+
+
+def redis_or_memory(env_var: str, factory: Callable):
+    # <env_var>=off|memory|redis：off返回None；否则以RedisAgent（redis不可用或
+    # 未启用时为None，即退回内存实现）调用factory
+    mode = os.getenv(env_var, 'memory').lower()
+    if mode == 'off':
+        return None
+    agent = None
+    if mode == 'redis':
+        try:
+            from redis_agent import RedisAgent
+            agent = RedisAgent(host=os.getenv('REDIS_HOST', 'localhost'),
+                               port=int(os.getenv('REDIS_PORT', 6379)))
+            agent._check_connection()
+        except Exception:
+            agent = None
+    return factory(agent)
@@ -0,0 +1,58 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import importlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+
+@dataclass
+class AgentSpec:
+    # 只描述路由所需的元数据，智能体模块及其依赖在首次路由到时才导入
+    name: str
+    module: str
+    class_name: str
+    patterns: Callable[[], List[str]]
+    # 返回[(命令正则, 命令名)]，用于从查询中识别具体子命令
+    commands: Optional[Callable[[], List[Tuple[str, str]]]] = None
+    _agent_class: Optional[type] = field(default=None, init=False, repr=False)
+
+    def load(self) -> type:
+        if self._agent_class is None:
+            self._agent_class = getattr(importlib.import_module(self.module), self.class_name)
+        return self._agent_class
+
+
+class AgentRegistry:
+    def __init__(self):
+        self._specs = OrderedDict()
+        self.version = 0
+
+    def register(self, spec: AgentSpec):
+        self._specs[spec.name] = spec
+        self.version += 1
+        return spec
+
+    def load(self, name: str) -> type:
+        return self._specs[name].load()
+
+    def patterns(self):
+        return OrderedDict((name, spec.patterns()) for name, spec in self._specs.items())
+
+    def command_patterns(self) -> List[Tuple[str, str]]:
+        return [command for spec in self._specs.values() if spec.commands
+                for command in spec.commands()]
@@ -0,0 +1,114 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Optional, Sequence, Union
+
+import aiohttp
+
+Prompt = Union[str, List[dict]]
+
+
+class AsyncDeepSeekClient:
+    API_BASE = os.getenv('DEEPSEEK_API_BASE', 'https://api.deepseek.com/v1')
+    MODEL = 'deepseek-chat'
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key: Optional[str] = None, api_base: Optional[str] = None,
+                 model: Optional[str] = None, concurrency: int = 8, timeout: float = 120,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30):
+        self.api_key = api_key or os.getenv('DEEPSEEK_API_KEY')
+        if not self.api_key:
+            raise ValueError('DEEPSEEK_API_KEY未在环境变量中设置')
+        self.api_base = api_base or self.API_BASE
+        self.model = model or self.MODEL
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        # 连接池大小与并发上限一致，保持keep-alive连接复用
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json'
+            }
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    async def chat(self, prompt: Prompt, **params) -> str:
+        messages = [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
+        payload = {'model': self.model, 'messages': messages, **params}
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._session.post(f'{self.api_base}/chat/completions',
+                                                  json=payload) as response:
+                        if response.status in self.RETRY_STATUSES and attempt < self.max_retries:
+                            delay = self._retry_delay(attempt, response.headers.get('Retry-After'))
+                        else:
+                            response.raise_for_status()
+                            data = await response.json()
+                            return data['choices'][0]['message']['content']
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._retry_delay(attempt)
+                await asyncio.sleep(delay)
+
+    async def chat_many(self, prompts: Sequence[Prompt], **params) -> List[str]:
+        # gather保持输入顺序；单个失败不影响其他请求
+        results = await asyncio.gather(*(self.chat(p, **params) for p in prompts),
+                                       return_exceptions=True)
+        return [f'API请求失败: {str(r)}' if isinstance(r, Exception) else r for r in results]
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # 带抖动的指数退避；服务端给出Retry-After时以其为下限（不受backoff_max限制，
+        # 只以请求超时为上限）
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                wait = float(retry_after)
+            except ValueError:
+                try:
+                    wait = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    wait = 0
+            delay = max(delay, min(self.timeout, max(0, wait)) + random.uniform(0, self.backoff_base))
+        return delay
+
+
+def run_batch(prompts: Sequence[Prompt], concurrency: int = 8, **kwargs) -> List[str]:
+    async def _run():
+        async with AsyncDeepSeekClient(concurrency=concurrency, **kwargs) as client:
+            return await client.chat_many(prompts)
+    return asyncio.run(_run())
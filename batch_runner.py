@@ -0,0 +1,284 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+import tracing
+from cody_worker import CodyWorker
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+QUERY_FIELDS = ('query', 'body', 'title')
+ID_FIELDS = ('id', 'request_id')
+
+
+@dataclass
+class BatchItem:
+    index: int
+    query: Optional[str]
+    id: Optional[str] = None
+    agent: Optional[str] = None
+    params: Optional[list] = None
+    response: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    def record(self) -> dict:
+        record = {'index': self.index, 'id': self.id, 'agent': self.agent,
+                  'query': self.query, 'elapsed_s': round(self.elapsed, 6)}
+        if self.error is not None:
+            record['error'] = self.error
+        else:
+            record['response'] = self.response
+        return record
+
+
+def read_items(stream) -> Iterator[BatchItem]:
+    # 逐行读取，不把整个输入文件载入内存；每行可以是对象或字符串
+    for index, raw in enumerate(stream):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            yield BatchItem(index, None, error=f'invalid JSON: {e}')
+            continue
+        if isinstance(data, str):
+            yield BatchItem(index, data)
+            continue
+        if not isinstance(data, dict):
+            yield BatchItem(index, None, error='expected a JSON object or string')
+            continue
+        query = next((data[f] for f in QUERY_FIELDS if data.get(f)), None)
+        item_id = next((data[f] for f in ID_FIELDS if data.get(f) is not None), None)
+        if query is None:
+            yield BatchItem(index, None, id=item_id,
+                            error='missing field: ' + '/'.join(QUERY_FIELDS))
+        else:
+            yield BatchItem(index, str(query), id=item_id)
+
+
+class _OrderedWriter:
+    # 结果可能乱序完成，只按输入顺序写出已完成的连续前缀
+    def __init__(self, out):
+        self.out = out
+        self._pending = {}
+        self._order = []
+        self._lock = threading.Lock()
+
+    def expect(self, items: List[BatchItem]):
+        with self._lock:
+            self._order.extend(item.index for item in items)
+
+    def done(self, item: BatchItem):
+        with self._lock:
+            self._pending[item.index] = item
+            while self._order and self._order[0] in self._pending:
+                finished = self._pending.pop(self._order.pop(0))
+                self.out.write(json.dumps(finished.record(), ensure_ascii=False) + '\n')
+            self.out.flush()
+
+
+class BatchRunner:
+    CHUNK_SIZE = 256
+
+    def __init__(self, cli, deepseek_concurrency: int = 8, cody_workers: int = 4,
+                 chunk_size: Optional[int] = None):
+        self.cli = cli
+        self.deepseek_concurrency = deepseek_concurrency
+        self.cody_workers = cody_workers
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._cody_workers = []
+        self._cody_available = None
+
+    def run(self, stream, out) -> Counter:
+        writer = _OrderedWriter(out)
+        # Zephyr命令会修改工作区，只能串行；Cody每个线程独立的worker进程；
+        # DeepSeek在单独线程的事件循环中按信号量并发
+        with ThreadPoolExecutor(1, thread_name_prefix='batch-zephyr') as zephyr_pool, \
+                ThreadPoolExecutor(self.cody_workers, thread_name_prefix='batch-cody') as cody_pool, \
+                ThreadPoolExecutor(1, thread_name_prefix='batch-deepseek') as deepseek_pool:
+            chunk = []
+            for item in read_items(stream):
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    self._run_chunk(chunk, writer, zephyr_pool, cody_pool, deepseek_pool)
+                    chunk = []
+            if chunk:
+                self._run_chunk(chunk, writer, zephyr_pool, cody_pool, deepseek_pool)
+        for worker in self._cody_workers:
+            worker.close()
+        return self.stats
+
+    def _run_chunk(self, chunk, writer, zephyr_pool, cody_pool, deepseek_pool):
+        writer.expect(chunk)
+        groups = defaultdict(list)
+        for item in chunk:
+            if item.error is None:
+                self._classify(item)
+            if item.error is not None:
+                self._finish(item, writer)
+            else:
+                groups[item.agent].append(item)
+
+        with tracing.span('batch.chunk', items=len(chunk),
+                          **{agent: len(items) for agent, items in groups.items()}):
+            futures = [zephyr_pool.submit(tracing.propagate(self._run_zephyr), item, writer)
+                       for item in groups.pop('zephyr', [])]
+            futures += [cody_pool.submit(tracing.propagate(self._run_cody), item, writer)
+                        for item in groups.pop('cody', [])]
+            if groups.get('deepseek'):
+                futures.append(deepseek_pool.submit(tracing.propagate(self._run_deepseek), groups.pop('deepseek'), writer))
+            # 其他已注册的智能体走通用分发
+            for items in groups.values():
+                futures += [zephyr_pool.submit(tracing.propagate(self._run_dispatch), item, writer) for item in items]
+            for future in wait(futures).done:
+                future.result()
+
+    def _classify(self, item: BatchItem):
+        try:
+            intent = self.cli._classify_intent(item.query)
+        except Exception as e:
+            item.error = f'{type(e).__name__}: {e}'
+            return
+        item.agent, item.params = intent['agent'], intent['params']
+        if item.agent == 'cody' and not self._cody_is_available():
+            item.agent = 'deepseek'
+            item.params = self.cli._extract_parameters('deepseek', item.query)
+
+    def _cody_is_available(self) -> bool:
+        if self._cody_available is None:
+            self._cody_available = CodyWorker().is_available()
+        return self._cody_available
+
+    def _finish(self, item: BatchItem, writer: _OrderedWriter):
+        # 各线程池并发完成条目，计数需要加锁
+        with self._stats_lock:
+            self.stats['failed' if item.error is not None else 'ok'] += 1
+            if item.agent:
+                self.stats[item.agent] += 1
+        writer.done(item)
+
+    def _run_zephyr(self, item: BatchItem, writer: _OrderedWriter):
+        start = time.perf_counter()
+        try:
+            # 与交互模式一致，通过CLI子进程执行zephyr子命令
+            result = tracing.run([sys.executable, CLI_PATH, 'zephyr'] + list(item.params),
+                                 capture_output=True, text=True)
+            if result.returncode != 0:
+                # CLI把错误信息打印到标准输出
+                item.error = (result.stderr or result.stdout or '').strip() or f'exit code {result.returncode}'
+            else:
+                item.response = result.stdout
+        except Exception as e:
+            item.error = f'{type(e).__name__}: {e}'
+        item.elapsed = time.perf_counter() - start
+        self._finish(item, writer)
+
+    def _run_dispatch(self, item: BatchItem, writer: _OrderedWriter):
+        start = time.perf_counter()
+        try:
+            result = self.cli.dispatch({'agent': item.agent, 'params': item.params}, item.query)
+            if isinstance(result, dict) and 'error' in result:
+                item.error = result['error']
+            else:
+                item.response = str(result.get('response') if isinstance(result, dict) else result)
+        except (Exception, SystemExit) as e:
+            item.error = f'{type(e).__name__}: {e}'
+        item.elapsed = time.perf_counter() - start
+        self._finish(item, writer)
+
+    def _cody_worker(self) -> CodyWorker:
+        worker = getattr(self._local, 'worker', None)
+        if worker is None:
+            worker = self._local.worker = CodyWorker()
+            self._cody_workers.append(worker)
+        return worker
+
+    def _run_cody(self, item: BatchItem, writer: _OrderedWriter):
+        start = time.perf_counter()
+        try:
+            result = self._cody_worker().run(['--query', item.query])
+            if result.returncode != 0:
+                item.error = (result.stderr or '').strip() or f'exit code {result.returncode}'
+            else:
+                item.response = result.stdout
+        except Exception as e:
+            item.error = f'{type(e).__name__}: {e}'
+        item.elapsed = time.perf_counter() - start
+        self._finish(item, writer)
+
+    def _run_deepseek(self, items: List[BatchItem], writer: _OrderedWriter):
+        from deepseek_agent import DeepSeekAgent
+        from llm_cache import LLMResponseCache
+        cache = LLMResponseCache.from_env()
+
+        async def _one(client, item):
+            start = time.perf_counter()
+            messages = [{'role': 'user', 'content': ' '.join(item.params[1:])}]
+            key = cache.make_key(DeepSeekAgent.MODEL, messages) if cache is not None else None
+            try:
+                item.response = cache.get(key) if key is not None else None
+                if item.response is None:
+                    item.response = await client.chat(messages)
+                    if key is not None:
+                        cache.set(key, item.response)
+            except Exception as e:
+                item.error = f'{type(e).__name__}: {e}'
+            item.elapsed = time.perf_counter() - start
+            self._finish(item, writer)
+
+        async def _run():
+            from async_deepseek import AsyncDeepSeekClient
+            async with AsyncDeepSeekClient(api_base=DeepSeekAgent.API_BASE, model=DeepSeekAgent.MODEL,
+                                           concurrency=self.deepseek_concurrency) as client:
+                await asyncio.gather(*(_one(client, item) for item in items))
+
+        with tracing.span('batch.deepseek', items=len(items)):
+            try:
+                asyncio.run(_run())
+            except Exception as e:
+                for item in items:
+                    if item.response is None and item.error is None:
+                        item.error = f'{type(e).__name__}: {e}'
+                        self._finish(item, writer)
+
+
+def run_batch_file(cli, input_path: str, output_path: str = '-', **kwargs) -> Counter:
+    runner = BatchRunner(cli, **kwargs)
+    with contextlib.ExitStack() as stack:
+        stream = sys.stdin if input_path == '-' else \
+            stack.enter_context(open(input_path, encoding='utf-8'))
+        if output_path == '-':
+            out = sys.stdout
+            # 结果写到标准输出时，把各命令自身的输出转到标准错误
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        else:
+            out = stack.enter_context(open(output_path, 'w', encoding='utf-8'))
+        return runner.run(stream, out)
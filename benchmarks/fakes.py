@@ -0,0 +1,214 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeChatServer:
+    # 本地OpenAI兼容的chat/completions服务，可配置延迟和流式输出
+    def __init__(self, latency=0.05, token_delay=0.005, tokens=20):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.requests = 0
+        self._server = None
+
+    def start(self) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                fake.requests += 1
+                time.sleep(fake.latency)
+                words = [f'tok{i} ' for i in range(fake.tokens)]
+                if body.get('stream'):
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for word in words:
+                        time.sleep(fake.token_delay)
+                        event = {'choices': [{'delta': {'content': word}}]}
+                        self._chunk(f'data: {json.dumps(event)}\n\n'.encode())
+                    self._chunk(b'data: [DONE]\n\n')
+                    self.wfile.write(b'0\r\n\r\n')
+                else:
+                    time.sleep(fake.token_delay * fake.tokens)
+                    out = json.dumps({'choices': [{'message': {'content': ''.join(words)}}]}).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(out)))
+                    self.end_headers()
+                    self.wfile.write(out)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1'
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class LocalRedis:
+    # 优先启动本地redis-server，否则使用fakeredis；两者都不可用时返回None
+    def __init__(self):
+        self.process = None
+        self.port = None
+        self.kind = None
+        self._original_redis = None
+
+    def start(self):
+        binary = shutil.which('redis-server')
+        if binary:
+            with socket.socket() as s:
+                s.bind(('127.0.0.1', 0))
+                self.port = s.getsockname()[1]
+            self.process = subprocess.Popen(
+                [binary, '--port', str(self.port), '--save', '', '--appendonly', 'no'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for _attempt in range(50):
+                try:
+                    socket.create_connection(('127.0.0.1', self.port), timeout=0.1).close()
+                    self.kind = 'redis-server'
+                    return self
+                except OSError:
+                    time.sleep(0.1)
+            self.stop()
+            return None
+        try:
+            import fakeredis
+            import redis
+        except ImportError:
+            return None
+        server = fakeredis.FakeServer()
+        # 让RedisAgent的连接池直接连到进程内的fakeredis服务，stop()时恢复
+        self._original_redis = redis.Redis
+        redis.Redis = lambda connection_pool=None, **kw: fakeredis.FakeRedis(server=server)
+        self.kind = 'fakeredis'
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stop(self):
+        if self._original_redis is not None:
+            import redis
+            redis.Redis, self._original_redis = self._original_redis, None
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+
+STUB_WEST = r'''
+import json, os, sys, time
+args = sys.argv[1:]
+delay = float(os.environ.get('STUB_DELAY', '0.05'))
+if args[:1] == ['build']:
+    build_dir = args[args.index('-d') + 1] if '-d' in args else 'build'
+    os.makedirs(os.path.join(build_dir, 'zephyr'), exist_ok=True)
+    time.sleep(delay)
+    open(os.path.join(build_dir, 'zephyr', 'zephyr.elf'), 'w').write('elf')
+elif args[:1] == ['twister']:
+    outdir = args[args.index('--outdir') + 1]
+    os.makedirs(outdir, exist_ok=True)
+    for i in range(200):
+        print(f'INFO - {i}/200 qemu_x86 tests/kernel/case{i} PASSED')
+    time.sleep(delay)
+    suites = [{'name': f'case{i}', 'status': 'passed'} for i in range(10)]
+    json.dump({'environment': {}, 'testsuites': suites}, open(os.path.join(outdir, 'twister.json'), 'w'))
+elif args[:1] == ['topdir']:
+    print(os.getcwd())
+elif args[:1] == ['list']:
+    print('manifest|HEAD|' + os.getcwd() + '|')
+else:
+    time.sleep(delay)
+'''
+
+STUB_CODY = r'''
+import sys, time, os
+time.sleep(float(os.environ.get('STUB_DELAY', '0.05')))
+print('1.0.0' if '--version' in sys.argv else 'cody answer')
+'''
+
+
+def write_stub_bin(directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    for name, body in (('west', STUB_WEST), ('cody', STUB_CODY), ('twister', STUB_WEST),
+                       ('npx', 'import subprocess, sys\nsys.exit(subprocess.call(sys.argv[1:]))\n')):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            f.write(f'#!{sys.executable}\n{body}')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return directory
+
+
+def make_upstream_repo(directory: str, pr_numbers=(1, 2, 3)) -> str:
+    # 带refs/pull/N/head的本地裸仓库，模拟GitHub上游
+    work = os.path.join(directory, 'seed')
+    bare = os.path.join(directory, 'upstream.git')
+    env = dict(os.environ, GIT_AUTHOR_NAME='bench', GIT_AUTHOR_EMAIL='bench@example.com',
+               GIT_COMMITTER_NAME='bench', GIT_COMMITTER_EMAIL='bench@example.com')
+
+    def git(*args, cwd=work):
+        subprocess.run(['git'] + list(args), cwd=cwd, check=True, capture_output=True, env=env)
+
+    os.makedirs(os.path.join(work, 'tests', 'kernel', 'sched'), exist_ok=True)
+    git('init', '-q', '-b', 'main')
+    with open(os.path.join(work, 'tests', 'kernel', 'sched', 'testcase.yaml'), 'w') as f:
+        f.write('tests:\n  kernel.sched: {}\n')
+    for i in range(50):
+        with open(os.path.join(work, f'file{i}.c'), 'w') as f:
+            f.write('int x%d = %d;\n' % (i, i) * 100)
+    git('add', '-A')
+    git('commit', '-qm', 'initial')
+    git('init', '-q', '--bare', bare, cwd=directory)
+    git('push', '-q', bare, 'main')
+    for number in pr_numbers:
+        git('checkout', '-q', '-b', f'pr{number}', 'main')
+        with open(os.path.join(work, f'pr{number}.c'), 'w') as f:
+            f.write(f'int pr{number};\n')
+        git('add', '-A')
+        git('commit', '-qm', f'pr {number}')
+        git('push', '-q', bare, f'HEAD:refs/pull/{number}/head')
+        git('checkout', '-q', 'main')
+    git('symbolic-ref', 'HEAD', 'refs/heads/main', cwd=bare)
+    return bare
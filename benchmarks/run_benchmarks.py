@@ -0,0 +1,287 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import locale_catalog
+from fakes import FakeChatServer, LocalRedis, make_upstream_repo, write_stub_bin
+
+# 部分测试直接导入各模块而不经过cli.py，需要自行安装_()
+locale_catalog.install()
+
+STARTUP_SNIPPET = (
+    "import runpy, sys; "
+    "sys.argv = ['cli.py', 'zephyr', '--help']; "
+    "runpy.run_path('cli.py', run_name='__main__')"
+)
+
+
+def measure(fn, repeat=20, warmup=1):
+    for _i in range(warmup):
+        fn()
+    samples = []
+    tracemalloc.start()
+    for _i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'min_s': samples[0],
+        'median_s': statistics.median(samples),
+        'mean_s': statistics.fmean(samples),
+        'p95_s': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'ops_per_s': repeat / sum(samples) if sum(samples) else None,
+        'peak_alloc_bytes': peak,
+    }
+
+
+def throughput(fn, items, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fn, items))
+    elapsed = time.perf_counter() - start
+    return {'items': len(items), 'workers': workers, 'elapsed_s': elapsed,
+            'items_per_s': len(items) / elapsed}
+
+
+def bench_startup(repeat):
+    samples = []
+    for _i in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', STARTUP_SNIPPET], cwd=REPO_ROOT,
+                       check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {'repeat': repeat, 'min_s': samples[0], 'median_s': statistics.median(samples)}
+
+
+def bench_process_query(repeat):
+    from cli import CodyCLI
+
+    results = {}
+    server = FakeChatServer()
+    os.environ['DEEPSEEK_API_BASE'] = server.start()
+    os.environ.setdefault('DEEPSEEK_API_KEY', 'benchmark')
+    # 会话历史是缓存键的一部分，这里关闭会话记忆以测量重复提问的缓存命中
+    os.environ['CONV_MEMORY'] = 'off'
+    try:
+        results['classify'] = measure(lambda: CodyCLI()._classify_intent('智能问答 benchmark'),
+                                      repeat=repeat * 100)
+        for mode in ('off', 'memory'):
+            os.environ['LLM_CACHE'] = mode
+            cli = CodyCLI()
+            results[f'deepseek_cache_{mode}'] = measure(
+                lambda: cli.process_query('智能问答 benchmark'), repeat=repeat)
+
+        os.environ['LLM_CACHE'] = 'off'
+        cli = CodyCLI()
+        ttft = []
+
+        def _stream():
+            response = cli.process_query('智能问答 stream', stream=True)
+            for _chunk in response['response']:
+                pass
+            ttft.append(cli.active_agents['deepseek'].metrics['ttft'])
+
+        results['deepseek_stream'] = measure(_stream, repeat=repeat)
+        results['deepseek_stream']['median_ttft_s'] = statistics.median(ttft)
+        results['deepseek_throughput'] = throughput(
+            lambda i: CodyCLI().process_query(f'智能问答 q{i}'), list(range(repeat * 4)), 8)
+        results['cody'] = measure(lambda: CodyCLI().process_query('how to clean build cache'),
+                                  repeat=max(3, repeat // 4))
+    finally:
+        server.stop()
+    return results
+
+
+def bench_async_batch(repeat):
+    from async_deepseek import run_batch
+
+    server = FakeChatServer()
+    base = server.start()
+    try:
+        prompts = [f'prompt {i}' for i in range(repeat * 5)]
+        start = time.perf_counter()
+        run_batch(prompts, concurrency=16, api_key='benchmark', api_base=base)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {'items': len(prompts), 'concurrency': 16, 'elapsed_s': elapsed,
+            'items_per_s': len(prompts) / elapsed}
+
+
+def bench_zephyr(workdir, repeat):
+    from zephyr_agent import ZephyrAgent
+
+    results = {}
+    upstream = make_upstream_repo(os.path.join(workdir, 'git'))
+    url = 'file://' + upstream
+    os.environ['ZEPHYR_AGENT_MIRRORS'] = os.path.join(workdir, 'mirrors')
+
+    counter = iter(range(10 ** 6))
+    results['clone_plain'] = measure(
+        lambda: ZephyrAgent(os.path.join(workdir, f'plain{next(counter)}')).clone_repo(url, mirror=False),
+        repeat=max(3, repeat // 4), warmup=0)
+    results['clone_mirror'] = measure(
+        lambda: ZephyrAgent(os.path.join(workdir, f'mirror{next(counter)}')).clone_repo(url),
+        repeat=max(3, repeat // 4))
+
+    project = os.path.join(workdir, 'project')
+    ZephyrAgent(project).clone_repo(url, mirror=False)
+    agent = ZephyrAgent(project)
+    results['compile_cold'] = measure(lambda: agent.compile_project('qemu_x86', force=True),
+                                      repeat=max(3, repeat // 4), warmup=0)
+    results['compile_cached'] = measure(lambda: agent.compile_project('qemu_x86'), repeat=repeat)
+    results['compile_boards'] = measure(
+        lambda: agent.compile_boards([f'board{i}' for i in range(6)], force=True),
+        repeat=max(3, repeat // 4), warmup=0)
+    results['test_sharded'] = measure(
+        lambda: agent.run_twister_tests('', platforms=['qemu_x86'], test_roots=['tests'], shards=4),
+        repeat=max(3, repeat // 4))
+
+    prs = itertools.cycle([1, 2, 3])
+    results['pr_worktree'] = measure(
+        lambda: ZephyrAgent(project).switch_pr(next(prs), worktree=True, pool_size=2),
+        repeat=max(3, repeat // 4))
+    results['check_environment'] = measure(lambda: agent.check_environment(), repeat=repeat)
+    return results
+
+
+def bench_redis(repeat):
+    with LocalRedis() as local:
+        if local is None:
+            return {'skipped': 'neither redis-server nor fakeredis is available'}
+        from redis_agent import RedisAgent
+        agent = RedisAgent(port=local.port or 6379)
+        payload = {'user_id': 1001, 'query': 'benchmark', 'log': 'x' * 2048}
+        keys = [f'bench:{i}' for i in range(100)]
+        results = {'backend': local.kind}
+        results['store_data_x100'] = measure(
+            lambda: [agent.store_data(k, payload) for k in keys], repeat=repeat)
+        results['retrieve_data_x100'] = measure(
+            lambda: [agent.retrieve_data(k) for k in keys], repeat=repeat)
+        results['store_many_100'] = measure(
+            lambda: agent.store_many({k: payload for k in keys}), repeat=repeat)
+        results['retrieve_many_100'] = measure(lambda: agent.retrieve_many(keys), repeat=repeat)
+        results['scan_prefix_100'] = measure(lambda: list(agent.scan_prefix('bench:')), repeat=repeat)
+        return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+SUITES = {
+    'startup': lambda workdir, repeat: bench_startup(repeat),
+    'process_query': lambda workdir, repeat: bench_process_query(repeat),
+    'async_batch': lambda workdir, repeat: bench_async_batch(repeat),
+    'zephyr': bench_zephyr,
+    'redis': lambda workdir, repeat: bench_redis(repeat),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the agent pipeline')
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help='suite to run (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=20, help='samples per measurement')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('--startup-budget', type=float,
+                        help='fail (exit 1) if the median CLI startup time exceeds this many seconds')
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    if args.startup_budget is not None and 'startup' not in suites:
+        suites.insert(0, 'startup')
+
+    with tempfile.TemporaryDirectory(prefix='zephyr_agent_bench_') as workdir:
+        # 所有外部依赖都替换为本地替身：桩可执行文件、独立缓存目录
+        os.environ['PATH'] = write_stub_bin(os.path.join(workdir, 'bin')) + os.pathsep + os.environ['PATH']
+        os.environ['ZEPHYR_AGENT_CACHE'] = os.path.join(workdir, 'cache')
+        os.environ['STUB_DELAY'] = os.environ.get('STUB_DELAY', '0.05')
+        os.environ.pop('CODY_WORKER_CMD', None)
+        os.environ.pop('DEEPSEEK_API_BASE', None)
+        import agent_cache
+        agent_cache.CACHE_ROOT = os.environ['ZEPHYR_AGENT_CACHE']
+
+        results = {}
+        for name in suites:
+            start = time.perf_counter()
+            try:
+                # 被测代码的终端输出转到stderr，保证stdout上只有JSON结果
+                with contextlib.redirect_stdout(sys.stderr):
+                    results[name] = SUITES[name](workdir, args.repeat)
+            except Exception as e:
+                results[name] = {'error': f'{type(e).__name__}: {e}'}
+            results[name]['suite_elapsed_s'] = time.perf_counter() - start
+
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        max_rss = None
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'max_rss': max_rss,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.startup_budget is not None:
+        median = results.get('startup', {}).get('median_s')
+        if median is None or median > args.startup_budget:
+            print(f'startup budget exceeded: {median} > {args.startup_budget}', file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+from typing import List, Optional
+
+import tracing
+from agent_cache import cache_path, load_json, save_json
+from manifest_fingerprint import ManifestFingerprint
+
+
+class BuildCache:
+    STAMP_FILE = 'zephyr_agent_build.json'
+    ARTIFACTS = ('zephyr/zephyr.elf', 'zephyr/zephyr.exe')
+    SKIP_DIRS = {'.git', 'build', 'twister-out'}
+
+    def __init__(self, project_path: str, build_root: Optional[str] = None):
+        self.project_path = os.path.abspath(project_path)
+        self.build_root = build_root or os.path.join(self.project_path, 'build')
+
+    def build_dir(self, board: str, conf_files: Optional[List[str]] = None) -> str:
+        # 每个板型/配置组合一个独立目录，切换板型不再需要pristine重建
+        name = board.replace('/', '_')
+        if conf_files:
+            name += '-' + hashlib.sha1('\n'.join(conf_files).encode()).hexdigest()[:8]
+        return os.path.join(self.build_root, name)
+
+    def key(self, board: str, conf_files: Optional[List[str]] = None) -> str:
+        digest = hashlib.sha256()
+        digest.update(board.encode())
+        for conf in conf_files or []:
+            digest.update(conf.encode())
+            digest.update(self._file_hash(os.path.join(self.project_path, conf)).encode())
+        digest.update(self.source_hash().encode())
+        digest.update(self.workspace_hash().encode())
+        return digest.hexdigest()
+
+    def workspace_hash(self) -> str:
+        # west模块和ZEPHYR_BASE的检出版本同样决定构建结果，按实际HEAD计入键
+        try:
+            fingerprint = ManifestFingerprint(self.project_path)
+            projects = fingerprint.resolved_projects()
+        except (subprocess.CalledProcessError, OSError):
+            zephyr_base = os.environ.get('ZEPHYR_BASE')
+            heads = {'zephyr': self._git_head(zephyr_base)} if zephyr_base else {}
+        else:
+            # 本项目自身由source_hash覆盖
+            projects = {name: project for name, project in projects.items()
+                        if name != 'manifest'
+                        and os.path.abspath(project['path']) != self.project_path}
+            heads = fingerprint.checked_out(projects)
+        digest = hashlib.sha256()
+        for name, head in sorted(heads.items()):
+            digest.update(f'{name}={head}\n'.encode())
+        return digest.hexdigest()
+
+    def _git_head(self, path: str) -> Optional[str]:
+        try:
+            return tracing.run(['git', 'rev-parse', 'HEAD'], cwd=path, check=True,
+                               capture_output=True, text=True).stdout.strip()
+        except (subprocess.CalledProcessError, OSError):
+            return None
+
+    def source_hash(self) -> str:
+        # git仓库：HEAD的树对象 + 工作区改动文件的内容；否则退回到遍历mtime
+        try:
+            # porcelain输出的路径相对仓库根目录，应用位于子目录时也要从根目录拼接
+            toplevel, tree = tracing.run(['git', 'rev-parse', '--show-toplevel', 'HEAD^{tree}'],
+                                         cwd=self.project_path, check=True, capture_output=True,
+                                         text=True).stdout.split()
+            status = tracing.run(['git', 'status', '--porcelain', '--untracked-files=normal'],
+                                 cwd=self.project_path, check=True, capture_output=True,
+                                 text=True).stdout
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return self._walk_hash()
+        digest = hashlib.sha256(tree.encode())
+        for line in sorted(status.splitlines()):
+            path = os.path.join(toplevel, line[3:].split(' -> ')[-1].strip('"'))
+            relpath = os.path.relpath(path, self.project_path).replace(os.sep, '/')
+            if (relpath + '/').startswith(tuple(d + '/' for d in self.SKIP_DIRS)):
+                continue
+            digest.update(line.encode())
+            digest.update(self._file_hash(path).encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, build_dir: str, key: str) -> bool:
+        stamp = load_json(os.path.join(build_dir, self.STAMP_FILE), {})
+        if stamp.get('key') != key:
+            return False
+        return any(os.path.exists(os.path.join(build_dir, a)) for a in self.ARTIFACTS)
+
+    def mark(self, build_dir: str, key: str):
+        save_json(os.path.join(build_dir, self.STAMP_FILE), {'key': key})
+
+    def ccache_args(self) -> List[str]:
+        return ['-DUSE_CCACHE=1'] if shutil.which('ccache') else []
+
+    def build_env(self) -> dict:
+        env = dict(os.environ)
+        if shutil.which('ccache'):
+            # 所有板型目录共享同一个ccache，BASEDIR让不同构建目录的命令行可互相命中
+            env.setdefault('CCACHE_DIR', os.path.dirname(cache_path('ccache', 'CACHEDIR.TAG')))
+            env.setdefault('CCACHE_BASEDIR', self.project_path)
+            env.setdefault('CCACHE_NOHASHDIR', '1')
+        return env
+
+    def _file_hash(self, path: str) -> str:
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        except OSError:
+            return 'missing'
+        return digest.hexdigest()
+
+    def _walk_hash(self) -> str:
+        digest = hashlib.sha256()
+        for root, dirnames, filenames in os.walk(self.project_path):
+            dirnames[:] = sorted(d for d in dirnames if d not in self.SKIP_DIRS)
+            for name in sorted(filenames):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(f'{os.path.relpath(path, self.project_path)}:{st.st_size}:{st.st_mtime_ns}'.encode())
+        return digest.hexdigest()
@@ -0,0 +1,93 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+
+
+class ChainRegistry:
+    def __init__(self):
+        self._chains = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'builds': 0, 'build_time': 0.0, 'runs': 0, 'run_time': 0.0}
+
+    def get(self, template: str, model_name: str, temperature: float):
+        # 每种(模板, 模型, 温度)组合只构建一次LLM客户端和链
+        key = (template, model_name, temperature)
+        chain = self._chains.get(key)
+        if chain is None:
+            with self._lock:
+                chain = self._chains.get(key)
+                if chain is None:
+                    start = time.perf_counter()
+                    chain = self._build(template, model_name, temperature)
+                    self._chains[key] = chain
+                    self._record('builds', 'build_time', time.perf_counter() - start)
+        return chain
+
+    def run(self, template: str, model_name: str, temperature: float, query: str) -> str:
+        chain = self.get(template, model_name, temperature)
+        start = time.perf_counter()
+        try:
+            return chain.run(query)
+        finally:
+            self._record('runs', 'run_time', time.perf_counter() - start)
+
+    def run_batch(self, template: str, model_name: str, temperature: float,
+                  queries: Sequence[str], max_workers: int = 8) -> List[str]:
+        chain = self.get(template, model_name, temperature)
+        if not queries:
+            return []
+
+        def _timed_run(query):
+            start = time.perf_counter()
+            try:
+                return chain.run(query)
+            finally:
+                self._record('runs', 'run_time', time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as pool:
+            return list(pool.map(_timed_run, queries))
+
+    def clear(self):
+        with self._lock:
+            self._chains.clear()
+
+    def _record(self, counter: str, timer: str, elapsed: float):
+        with self._stats_lock:
+            self.stats[counter] += 1
+            self.stats[timer] += elapsed
+
+    @staticmethod
+    def _build(template: str, model_name: str, temperature: float):
+        from langchain.chains import LLMChain
+        from langchain.llms import OpenAI
+        from langchain.prompts import PromptTemplate
+
+        prompt = PromptTemplate.from_template(template)
+        llm = OpenAI(
+            temperature=temperature,
+            openai_api_key=os.getenv('OPENAI_API_KEY'),
+            model_name=model_name
+        )
+        return LLMChain(llm=llm, prompt=prompt)
+
+
+default_registry = ChainRegistry()
@@ -16,107 +16,155 @@ limitations under the License.
 """
 
 import argparse
+import re
 import subprocess
 import sys
-from dotenv import load_dotenv
 import os
-from zephyr_agent import ZephyrAgent
-from deepseek_agent import DeepSeekAgent
+import locale_catalog
+import tracing
+from agent_registry import AgentRegistry, AgentSpec
+from intent_index import IntentIndex
+from cody_worker import CodyWorker
+
+# 安装全局的_()，翻译目录在首次查找时才加载
+locale_catalog.install()
+
+_cody_worker = None
+
+def get_cody_worker():
+    global _cody_worker
+    if _cody_worker is None:
+        _cody_worker = CodyWorker()
+    return _cody_worker
 
 def execute_cody_command(args):
-    try:
-        result = subprocess.run(
-            ['npx', 'cody'] + args,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(_('cli.error.command_failed').format(error=e.stderr))
+    result = get_cody_worker().run(args)
+    if result.returncode != 0:
+        print(_('cli.error.command_failed').format(error=result.stderr))
         sys.exit(1)
+    return result.stdout
+
+AGENTS = AgentRegistry()
+AGENTS.register(AgentSpec(
+    'zephyr', 'zephyr_agent', 'ZephyrAgent',
+    lambda: [
+        r'(?i)({}|{})'.format(_('cli.pattern.env_init'), _('cli.pattern.set_path')),
+        r'(?i)({}|{})'.format(_('cli.pattern.clone_repo'), _('cli.pattern.download_code')),
+        r'(?i)({}|{})'.format(_('cli.pattern.switch_pr'), _('cli.pattern.merge_request')),
+        r'(?i)({}|{})'.format(_('cli.pattern.compile'), _('cli.pattern.build_fw')),
+        r'(?i)({}|{})'.format(_('cli.pattern.run_test'), _('cli.pattern.execute_case'))
+    ],
+    lambda: [
+        (r'(?i){}'.format(_('cli.pattern.init')), 'init'),
+        (r'(?i){}'.format(_('cli.pattern.clone')), 'clone'),
+        (r'(?i){}'.format(_('cli.pattern.pr')), 'pr'),
+        (r'(?i){}'.format(_('cli.pattern.compile')), 'compile')
+    ]
+))
+AGENTS.register(AgentSpec(
+    'deepseek', 'deepseek_agent', 'DeepSeekAgent',
+    lambda: [
+        r'(?i)(智能问答|知识查询|API调用)',
+        r'(?i)使用DeepSeek',
+        r'(?i)调用.*模型'
+    ]
+))
 
 class CodyCLI:
-    AGENT_MATRIX = {
-        'zephyr': {
-            'patterns': [
-                r'(?i)({}|{})'.format(_('cli.pattern.env_init'), _('cli.pattern.set_path')),
-                r'(?i)({}|{})'.format(_('cli.pattern.clone_repo'), _('cli.pattern.download_code')),
-                r'(?i)({}|{})'.format(_('cli.pattern.switch_pr'), _('cli.pattern.merge_request')),
-                r'(?i)({}|{})'.format(_('cli.pattern.compile'), _('cli.pattern.build_fw')),
-                r'(?i)({}|{})'.format(_('cli.pattern.run_test'), _('cli.pattern.execute_case'))
-            ],
-            'agent': ZephyrAgent
-        },
-        'deepseek': {
-            'patterns': [
-                r'(?i)(智能问答|知识查询|API调用)',
-                r'(?i)使用DeepSeek',
-                r'(?i)调用.*模型'
-            ],
-            'agent': DeepSeekAgent
-        }
-    }
+    AGENTS = AGENTS
+
+    _intent_index = None
+    _intent_index_version = None
 
     def __init__(self):
         self.active_agents = {}
 
+    @classmethod
+    def intent_index(cls):
+        # 模式与参数提取器只编译一次，所有CodyCLI实例共享
+        # 注册新的智能体或切换语言目录后重新构建
+        version = (cls.AGENTS.version, locale_catalog.version())
+        if cls._intent_index is None or cls._intent_index_version != version:
+            cls._intent_index = IntentIndex(
+                cls.AGENTS.patterns(),
+                cls.AGENTS.command_patterns(),
+                cls._param_extractors()
+            )
+            cls._intent_index_version = version
+        return cls._intent_index
+
     def _classify_intent(self, query):
-        for agent_name, config in self.AGENT_MATRIX.items():
-            for pattern in config['patterns']:
-                if re.search(pattern, query, re.IGNORECASE):
-                    return {
-                        'agent': agent_name,
-                        'params': self._extract_parameters(agent_name, query)
-                    }
-        return {'agent': 'cody', 'params': []}
-
-    def process_query(self, query):
-        intent = self._classify_intent(query)
+        with tracing.span('cli.classify'):
+            agent, params = self.intent_index().classify(query)
+        return {'agent': agent, 'params': list(params)}
+
+    def process_query(self, query, stream=False):
+        with tracing.span('cli.process_query') as current:
+            result = self._process_query(query, stream)
+            if isinstance(result, dict):
+                current.set(agent=result['agent'])
+            return result
+
+    def _process_query(self, query, stream=False):
+        return self.dispatch(self._classify_intent(query), query, stream)
+
+    def dispatch(self, intent, query, stream=False):
+        # 已分类的查询直接交给对应智能体，批量模式据此避免重复分类
         if intent['agent'] == 'cody':
-            # 检测Cody CLI可用性
-            try:
-                subprocess.run(['npx', 'cody', '--version'], capture_output=True, check=True)
-            except (subprocess.CalledProcessError, FileNotFoundError):
+            # 检测Cody CLI可用性（TTL缓存）
+            if not get_cody_worker().is_available():
                 # 自动切换到DeepSeek备用模式
                 intent['agent'] = 'deepseek'
                 intent['params'] = self._extract_parameters('deepseek', query)
             else:
                 return execute_cody_command(['--query', query])
         
-        agent_class = self.AGENT_MATRIX[intent['agent']]['agent']
         if intent['agent'] not in self.active_agents:
-            self.active_agents[intent['agent']] = agent_class()
+            with tracing.span('agent.init', agent=intent['agent']):
+                agent_class = self.AGENTS.load(intent['agent'])
+                self.active_agents[intent['agent']] = agent_class()
         
         try:
-            response = self.active_agents[intent['agent']].handle_command(intent['params'])
+            agent = self.active_agents[intent['agent']]
+            with tracing.span('agent.handle_command', agent=intent['agent']):
+                if stream and getattr(agent, 'STREAMING', False):
+                    # 返回生成器，由调用方逐段输出
+                    response = agent.handle_command(intent['params'], stream=True)
+                else:
+                    response = agent.handle_command(intent['params'])
             return {'agent': intent['agent'], 'response': response}
         except Exception as e:
             return {'agent': intent['agent'], 'error': str(e)}
 
     def _extract_parameters(self, agent_name, query):
-        param_extractors = {
+        return self.intent_index().extract(agent_name, query)
+
+    @staticmethod
+    def _param_extractors():
+        path_re = re.compile(r'{}[：:]\s*(\S+)'.format(_('cli.pattern.path')))
+        url_re = re.compile(r'(http[s]?://\S+)')
+        pr_re = re.compile(r'(?:{}|{})\s*#?(\d+)'.format(_('cli.pattern.pr_number'), _('cli.pattern.pr_id')))
+        board_re = re.compile(r'{}[：:]\s*(\w+)'.format(_('cli.pattern.board')))
+        qa_prefix_re = re.compile(r'^(?:{})\s*'.format(_('cli.pattern.qa_prefix')))
+
+        def with_arg(command, pattern, *flags):
+            # 参数未匹配时只返回命令本身，由子命令报告缺少的参数
+            def extract(q):
+                match = pattern.search(q)
+                return [command, *flags, match.group(1)] if match else [command]
+            return extract
+
+        return {
             'zephyr': {
-                'init': lambda q: ['init', '--path', re.search(r'{}[：:]\s*(\S+)'.format(_('cli.pattern.path')), q).group(1)] if _('cli.pattern.path') in q else ['init'],
-                'clone': lambda q: ['clone', re.search(r'(http[s]?://\S+)', q).group(1)],
-                'pr': lambda q: ['pr', re.search(r'{}|{}'.format(_('cli.pattern.pr_number'), _('cli.pattern.pr_id')), q).group(1)],
-                'compile': lambda q: ['compile', '-b', re.search(r'{}[：:]\s*(\w+)'.format(_('cli.pattern.board')), q).group(1)]
+                'init': with_arg('init', path_re, '--path'),
+                'clone': with_arg('clone', url_re),
+                'pr': with_arg('pr', pr_re),
+                'compile': with_arg('compile', board_re, '-b')
             },
-        'deepseek': {
-            'chat': lambda q: ['chat', re.sub(r'^{}\s*'.format(_('cli.pattern.qa_prefix')), '', q)]
+            'deepseek': {
+                'chat': lambda q: ['chat', qa_prefix_re.sub('', q)]
+            }
         }
-        }
-
-        command_types = {
-            r'(?i){}'.format(_('cli.pattern.init')): 'init',
-            r'(?i){}'.format(_('cli.pattern.clone')): 'clone',
-            r'(?i){}'.format(_('cli.pattern.pr')): 'pr',
-            r'(?i){}'.format(_('cli.pattern.compile')): 'compile'
-        }
-        for pattern, cmd_type in command_types.items():
-            if re.search(pattern, query):
-                return param_extractors[agent_name][cmd_type](query)
-        return []
 
     def _execute_zephyr_command(self, base_cmd, query):
         cmd_args = base_cmd.copy()
@@ -138,11 +186,125 @@ class CodyCLI:
                 cmd_args.extend(['-b', board_match.group(1)])
         return execute_cody_command(cmd_args)
 
+def find_env_file():
+    # 与load_dotenv()的默认行为一致：从cli.py所在目录逐级向上查找.env，最后再看当前目录
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return '.env' if os.path.isfile('.env') else None
+
+def print_response(response):
+    if isinstance(response, dict):
+        if 'error' in response:
+            print(f"[!] {response['agent']} Agent Error: {response['error']}")
+        elif hasattr(response.get('response'), '__next__'):
+            # 流式响应：边生成边输出
+            print(f"[{response['agent'].upper()}] ", end='', flush=True)
+            for chunk in response['response']:
+                print(chunk, end='', flush=True)
+            print()
+        else:
+            print(f"[{response['agent'].upper()}] {response.get('response', '')}")
+    else:
+        print(f"[CODY] {response}")
+
+def show_logs(args):
+    from log_pipeline import LogIndex
+    index = LogIndex(args.log) if args.log else LogIndex.last()
+    if index is None or not index.segments():
+        print(_('cli.log.none'))
+        return
+    if args.llm:
+        print(index.context_for_llm(max_chars=args.max_chars, severity=args.severity or 'error'))
+        return
+    print(_('cli.log.header').format(path=index.path))
+    for (category, severity), count in sorted(index.summary().items()):
+        print(_('cli.log.count').format(category=category, severity=severity, count=count))
+    for entry in index.entries(severity=args.severity, category=args.category):
+        location = ':'.join(str(entry[k]) for k in ('file', 'line') if k in entry)
+        print(_('cli.log.entry').format(line_no=entry['line_no'], category=entry['category'],
+                                        location=location, message=entry['message']))
+        if args.context:
+            print(index.slice(entry, before=args.context, after=args.context))
+
+def print_jobs(jobs):
+    if not jobs.jobs:
+        print(_('cli.job.none'))
+    for job in jobs.jobs.values():
+        print(_('cli.job.entry').format(id=job.id, status=job.status,
+                                        elapsed=job.elapsed, description=job.description))
+
+def _job_id(text):
+    return int(text.strip().lstrip('#')) if text.strip().lstrip('#').isdigit() else None
+
+async def run_interactive(cli, max_jobs=2):
+    import asyncio
+    from job_manager import JobManager
+    # Zephyr命令作为后台子进程运行，对话查询在线程中执行，事件循环保持响应
+    jobs = JobManager(
+        max_jobs,
+        on_output=lambda job, line: print(f"[job {job.id}] {line}", end='', flush=True),
+        on_finish=lambda job: print(_('cli.job.finished').format(
+            id=job.id, status=job.status, returncode=job.returncode, elapsed=job.elapsed))
+    )
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                query = (await loop.run_in_executor(None, input, _('cli.prompt.interactive'))).strip()
+            except EOFError:
+                break
+            if query.lower() in ('exit', 'quit'): break
+            if not query:
+                continue
+
+            command, _sep, rest = query.partition(' ')
+            if command == 'jobs':
+                print_jobs(jobs)
+                continue
+            if command in ('wait', 'cancel'):
+                job_id = _job_id(rest) if rest else None
+                if rest and jobs.get(job_id) is None:
+                    print(_('cli.job.unknown').format(id=rest.strip()))
+                elif command == 'wait':
+                    await jobs.wait(job_id)
+                elif job_id is None or not jobs.cancel(job_id):
+                    print(_('cli.job.not_running').format(id=rest.strip()))
+                continue
+
+            try:
+                intent = cli._classify_intent(query)
+            except Exception as e:
+                print(f"[!] {e}")
+                continue
+            if intent['agent'] == 'zephyr' and intent['params']:
+                job = jobs.submit(query, [sys.executable, os.path.abspath(__file__), 'zephyr'] + intent['params'])
+                print(_('cli.job.started').format(id=job.id, description=job.description))
+            else:
+                response = await loop.run_in_executor(None, cli.process_query, query, True)
+                # 流式输出同样放到线程中，避免阻塞后台任务的进度
+                await loop.run_in_executor(None, print_response, response)
+    finally:
+        if jobs.active():
+            print(_('cli.job.cancelling').format(count=len(jobs.active())))
+        await jobs.shutdown()
+
 if __name__ == "__main__":
-    load_dotenv()
-    import re
+    # 没有.env文件时不导入dotenv，减少启动开销
+    env_file = find_env_file()
+    if env_file:
+        from dotenv import load_dotenv
+        load_dotenv(env_file)
     parser = argparse.ArgumentParser(prog='cody', description=_('cli.description'))
     parser.add_argument('--zephyr-cmd', help=_('cli.internal.zephyr_command'), nargs='*', default=[])
+    parser.add_argument('--profile', nargs='?', const='zephyr_agent_trace.json', metavar='TRACE_FILE',
+                        help=_('cli.help.profile'))
     subparsers = parser.add_subparsers(dest='command')
 
     # 查询子命令
@@ -151,6 +313,14 @@ if __name__ == "__main__":
 
     # 交互式子命令
     interactive_parser = subparsers.add_parser('interactive', help=_('cli.help.interactive'))
+    interactive_parser.add_argument('--max-jobs', type=int, default=2, help=_('cli.help.max_jobs'))
+
+    # 批量子命令
+    batch_parser = subparsers.add_parser('batch', help=_('cli.help.batch'))
+    batch_parser.add_argument('input', help=_('cli.help.batch_input'))
+    batch_parser.add_argument('-o', '--output', default='-', help=_('cli.help.batch_output'))
+    batch_parser.add_argument('--concurrency', type=int, default=8, help=_('cli.help.batch_concurrency'))
+    batch_parser.add_argument('--cody-workers', type=int, default=4, help=_('cli.help.cody_workers'))
 
     # Zephyr子命令
     zephyr_parser = subparsers.add_parser('zephyr', help=_('cli.help.zephyr'))
@@ -161,15 +331,46 @@ if __name__ == "__main__":
 
     clone_parser = zephyr_subparsers.add_parser('clone', help=_('cli.help.clone_repo'))
     clone_parser.add_argument('repo_url', type=str, help=_('cli.help.repo_url'))
+    clone_parser.add_argument('--no-mirror', action='store_true', help=_('cli.help.no_mirror'))
+    clone_parser.add_argument('--partial', action='store_true', help=_('cli.help.partial_clone'))
+    clone_parser.add_argument('--depth', type=int, help=_('cli.help.depth'))
+    clone_parser.add_argument('-j', '--jobs', type=int, help=_('cli.help.submodule_jobs'))
 
     pr_parser = zephyr_subparsers.add_parser('pr', help=_('cli.help.switch_pr'))
     pr_parser.add_argument('pr_number', type=int, help=_('cli.help.pr_number'))
+    pr_parser.add_argument('--worktree', action='store_true', help=_('cli.help.worktree'))
+    pr_parser.add_argument('--refresh', action='store_true', help=_('cli.help.refresh'))
+    pr_parser.add_argument('--pool-size', type=int, default=4, help=_('cli.help.pool_size'))
+    pr_parser.add_argument('--full-update', action='store_true', help=_('cli.help.full_update'))
 
     compile_parser = zephyr_subparsers.add_parser('compile', help=_('cli.help.compile'))
-    compile_parser.add_argument('-b', '--board', type=str, required=True, help=_('cli.help.board'))
+    compile_parser.add_argument('-b', '--board', type=str, action='append', required=True, help=_('cli.help.board'))
+    compile_parser.add_argument('--conf', action='append', help=_('cli.help.conf_file'))
+    compile_parser.add_argument('-j', '--jobs', type=int, help=_('cli.help.jobs'))
+    compile_parser.add_argument('--pristine', action='store_true', help=_('cli.help.pristine'))
 
     test_parser = zephyr_subparsers.add_parser('test', help=_('cli.help.run_tests'))
     test_parser.add_argument('-a', '--args', help=_('cli.help.additional_args'))
+    test_parser.add_argument('-p', '--platform', action='append', help=_('cli.help.platform'))
+    test_parser.add_argument('-T', '--testsuite-root', action='append', help=_('cli.help.testsuite_root'))
+    test_parser.add_argument('--shards', type=int, help=_('cli.help.shards'))
+    test_parser.add_argument('--impact', action='store_true', help=_('cli.help.impact'))
+    test_parser.add_argument('--base', help=_('cli.help.base_ref'))
+
+    logs_parser = zephyr_subparsers.add_parser('logs', help=_('cli.help.logs'))
+    logs_parser.add_argument('log', nargs='?', help=_('cli.help.log_file'))
+    logs_parser.add_argument('--severity', choices=('error', 'warning'), help=_('cli.help.severity'))
+    logs_parser.add_argument('--category', help=_('cli.help.category'))
+    logs_parser.add_argument('-C', '--context', type=int, default=0, help=_('cli.help.context_lines'))
+    logs_parser.add_argument('--llm', action='store_true', help=_('cli.help.llm_context'))
+    logs_parser.add_argument('--max-chars', type=int, default=4000, help=_('cli.help.max_chars'))
+
+    args = parser.parse_args()
+    if args.profile:
+        # 退出时写出JSON追踪文件和同名.prom的Prometheus汇总
+        import atexit
+        tracing.enable()
+        atexit.register(tracing.export, args.profile)
 
     try:
         cli = CodyCLI()
@@ -183,42 +384,70 @@ if __name__ == "__main__":
             query = args.input or input(_('cli.prompt.query'))
             response = cli.process_query(query)
             print(response)
+        elif args.command == 'batch':
+            from batch_runner import run_batch_file
+            stats = run_batch_file(cli, args.input, args.output,
+                                   deepseek_concurrency=args.concurrency,
+                                   cody_workers=args.cody_workers)
+            print(_('cli.batch_summary').format(ok=stats['ok'], failed=stats['failed']), file=sys.stderr)
         elif args.command == 'interactive':
-            while True:
-                query = input(_('cli.prompt.interactive'))
-                if query.lower() in ('exit', 'quit'): break
-                if query:
-                    response = cli.process_query(query)
-                    if isinstance(response, dict):
-                        if 'error' in response:
-                            print(f"[!] {response['agent']} Agent Error: {response['error']}")
-                        else:
-                            print(f"[{response['agent'].upper()}] {response.get('response', '')}")
-                    else:
-                        print(f"[CODY] {response}")
+            # asyncio只在交互模式下导入，避免拖慢单次命令的启动
+            import asyncio
+            asyncio.run(run_interactive(cli, args.max_jobs))
         elif args.command == 'zephyr':
+            ZephyrAgent = AGENTS.load('zephyr')
             agent = ZephyrAgent(args.path) if hasattr(args, 'path') else ZephyrAgent()
             try:
-                if args.zephyr_command == 'init':
-                    if not agent.check_environment():
-                        print(_('cli.installing_dependencies'))
-                        agent.setup_environment()
-                    else:
-                        print(_('cli.env_ready'))
-                elif args.zephyr_command == 'clone':
-                    agent.clone_repo(args.repo_url)
-                    print(_('cli.repo_cloned').format(path=agent.project_path))
-                elif args.zephyr_command == 'pr':
-                    agent.switch_pr(args.pr_number)
-                    print(_('cli.pr_switched').format(number=args.pr_number))
-                elif args.zephyr_command == 'compile':
-                    agent.compile_project(args.board)
-                    print(_('cli.build_complete'))
-                elif args.zephyr_command == 'test':
-                    agent.run_twister_tests(args.args)
+                with tracing.span(f'zephyr.{args.zephyr_command}'):
+                    if args.zephyr_command == 'init':
+                        if not agent.check_environment():
+                            print(_('cli.installing_dependencies'))
+                            agent.setup_environment()
+                        else:
+                            print(_('cli.env_ready'))
+                    elif args.zephyr_command == 'clone':
+                        agent.clone_repo(args.repo_url, mirror=not args.no_mirror, partial=args.partial,
+                                         depth=args.depth, jobs=args.jobs)
+                        print(_('cli.repo_cloned').format(path=agent.project_path))
+                    elif args.zephyr_command == 'pr':
+                        path = agent.switch_pr(args.pr_number, args.worktree, args.refresh,
+                                               args.pool_size, args.full_update)
+                        print(_('cli.pr_switched').format(number=args.pr_number))
+                        if args.worktree:
+                            print(_('cli.worktree_path').format(path=path))
+                    elif args.zephyr_command == 'compile':
+                        if len(args.board) == 1:
+                            agent.compile_project(args.board[0], args.conf, args.jobs, args.pristine)
+                            print(_('cli.build_complete'))
+                        else:
+                            results = agent.compile_boards(args.board, args.conf, args.jobs,
+                                                           force=args.pristine)
+                            for board, result in results.items():
+                                if isinstance(result, Exception):
+                                    print(_('cli.error.general').format(error=str(result)))
+                                else:
+                                    print(_('cli.board_built').format(board=board, path=result))
+                    elif args.zephyr_command == 'test':
+                        run = agent.run_twister_tests(args.args,
+                                                      platforms=args.platform,
+                                                      test_roots=args.testsuite_root,
+                                                      shards=args.shards,
+                                                      impact=args.impact,
+                                                      base_ref=args.base)
+                        if run is None:
+                            print(_('cli.no_impacted_tests'))
+                        else:
+                            print(_('cli.test_summary').format(
+                                summary=', '.join(f'{k}={v}' for k, v in run.summary.items()),
+                                report=run.report))
+                    elif args.zephyr_command == 'logs':
+                        show_logs(args)
             except subprocess.CalledProcessError as e:
                 print(_('cli.error.command').format(error=e.stderr))
+                # 以非零状态退出，后台任务和批量模式据此判断失败
+                sys.exit(1)
             except Exception as e:
                 print(_('cli.error.general').format(error=str(e)))
+                sys.exit(1)
     except Exception as e:
         print(_('cli.error.prefix') + str(e))
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import atexit
+import json
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+import tracing
+from agent_cache import cache_path, load_json, save_json
+
+
+class CodyWorker:
+    AVAILABILITY_TTL = 300
+    # 检测失败只短暂缓存，一次偶然失败不会让Cody长时间不可用
+    UNAVAILABLE_TTL = 30
+    VERSION_TIMEOUT = 15
+    REPLY_TIMEOUT = 120
+    CACHE_FILE = 'cody_availability.json'
+
+    def __init__(self, worker_cmd: Optional[List[str]] = None, ttl: Optional[float] = None):
+        self.base_cmd = self.resolve_cody_command()
+        if worker_cmd is None and os.getenv('CODY_WORKER_CMD'):
+            worker_cmd = shlex.split(os.getenv('CODY_WORKER_CMD'))
+        self.worker_cmd = worker_cmd
+        self.ttl = self.AVAILABILITY_TTL if ttl is None else ttl
+        self.reply_timeout = float(os.getenv('CODY_WORKER_TIMEOUT', self.REPLY_TIMEOUT))
+        self._process = None
+        self._replies = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @staticmethod
+    def resolve_cody_command() -> List[str]:
+        # 直接调用本地安装的cody可执行文件，省去npx每次的包解析与冷启动
+        here = os.path.dirname(os.path.abspath(__file__))
+        for root in (os.getcwd(), here):
+            for name in ('cody', 'cody.cmd'):
+                local_bin = os.path.join(root, 'node_modules', '.bin', name)
+                if os.path.isfile(local_bin):
+                    return [local_bin]
+        global_bin = shutil.which('cody')
+        if global_bin:
+            return [global_bin]
+        return ['npx', 'cody']
+
+    def is_available(self) -> bool:
+        # 可用性检测结果在TTL内复用，单次查询的CLI进程也能命中磁盘缓存
+        cache_file = cache_path(self.CACHE_FILE)
+        cached = load_json(cache_file, {})
+        ttl = self.ttl if cached.get('available') else min(self.ttl, self.UNAVAILABLE_TTL)
+        if (cached.get('command') == self.base_cmd
+                and time.time() - cached.get('checked', 0) < ttl):
+            return cached['available']
+
+        try:
+            tracing.run(self.base_cmd + ['--version'], capture_output=True, check=True,
+                        timeout=self.VERSION_TIMEOUT)
+            available = True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            available = False
+        try:
+            save_json(cache_file, {'command': self.base_cmd, 'available': available,
+                                   'checked': time.time()})
+        except OSError:
+            pass
+        return available
+
+    def run(self, args: List[str]) -> subprocess.CompletedProcess:
+        if self.worker_cmd:
+            with self._lock, tracing.span('cody.worker'):
+                return self._run_in_worker(args)
+        return tracing.run(self.base_cmd + args, capture_output=True, text=True)
+
+    def _start_worker(self):
+        self._process = subprocess.Popen(
+            self.worker_cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        # 后台线程逐行读取响应，读取时才能设置超时
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, args=(self._process.stdout, self._replies),
+                         daemon=True).start()
+
+    @staticmethod
+    def _read_replies(stream, replies):
+        for line in stream:
+            replies.put(line)
+        replies.put('')
+
+    def _run_in_worker(self, args: List[str]) -> subprocess.CompletedProcess:
+        # 常驻进程协议：每行一个JSON请求 {"args": [...]}，
+        # 每行一个JSON响应 {"stdout": ..., "stderr": ..., "returncode": ...}
+        request = json.dumps({'args': args}, ensure_ascii=False) + '\n'
+        for attempt in range(2):
+            if self._process is None or self._process.poll() is not None:
+                self._start_worker()
+            try:
+                self._process.stdin.write(request)
+                self._process.stdin.flush()
+                line = self._replies.get(timeout=self.reply_timeout)
+            except (BrokenPipeError, OSError):
+                line = ''
+            except queue.Empty:
+                # 常驻进程无响应：结束它，下次请求时重新启动
+                self.close(kill=True)
+                raise RuntimeError(_('cli.error.cody_worker_timeout').format(
+                    timeout=self.reply_timeout))
+            try:
+                reply = json.loads(line) if line else None
+            except ValueError:
+                reply = None
+            if isinstance(reply, dict):
+                return subprocess.CompletedProcess(
+                    self.worker_cmd + args,
+                    reply.get('returncode', 0),
+                    reply.get('stdout', ''),
+                    reply.get('stderr', '')
+                )
+            # 进程崩溃或响应无效，结束进程后重启并重试一次
+            self.close(kill=True)
+        raise RuntimeError(_('cli.error.cody_worker_failed'))
+
+    def close(self, kill: bool = False):
+        process, self._process = self._process, None
+        if process and process.poll() is None:
+            if kill:
+                process.kill()
+                process.wait()
+                return
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
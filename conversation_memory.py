@@ -0,0 +1,182 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import re
+import threading
+from typing import Callable, List, Optional
+
+from agent_cache import redis_or_memory
+
+# 粗略估算token数：中日韩字符按1个token计，其余按4个字符1个token计
+_CJK = re.compile(r'[　-〿㐀-䶿一-鿿豈-﫿＀-￯]')
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4 + MESSAGE_OVERHEAD
+
+
+class _LocalLists:
+    # RedisAgent列表接口的进程内实现，未启用Redis时使用
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _slice(self, key, start, end):
+        # 与LRANGE/LTRIM相同的闭区间及负索引语义
+        items = self._data.get(key, [])
+        size = len(items)
+        start = max(start + size if start < 0 else start, 0)
+        end = end + size if end < 0 else end
+        return items[start:end + 1]
+
+    def append_list(self, key, values, max_len=None, ttl=None):
+        with self._lock:
+            items = self._data.setdefault(key, [])
+            items.extend(values)
+            if max_len and len(items) > max_len:
+                del items[:len(items) - max_len]
+        return True
+
+    def list_range(self, key, start=0, end=-1):
+        with self._lock:
+            return list(self._slice(key, start, end))
+
+    def list_length(self, key):
+        with self._lock:
+            return len(self._data.get(key, []))
+
+    def trim_list(self, key, start, end=-1):
+        with self._lock:
+            self._data[key] = self._slice(key, start, end)
+        return True
+
+    def store_data(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = value
+        return True
+
+    def retrieve_data(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+    def delete_keys(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+class ConversationStore:
+    KEY_PREFIX = 'conv:'
+    PAGE_SIZE = 16
+
+    def __init__(self, redis_agent=None, token_budget: int = 3000, ttl: int = 7 * 24 * 3600,
+                 max_messages: int = 200,
+                 summarizer: Optional[Callable[[Optional[str], List[dict]], str]] = None,
+                 summarize_min: int = 8):
+        # redis_agent为None时历史只保存在当前进程中
+        self.backend = redis_agent if redis_agent is not None else _LocalLists()
+        self.token_budget = token_budget
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.summarizer = summarizer
+        self.summarize_min = summarize_min
+        # 每个会话最近一次加载时未放入预算的旧消息条数，供压缩使用
+        self._overflow = {}
+
+    @classmethod
+    def from_env(cls, summarizer=None):
+        # CONV_MEMORY=off|memory|redis，redis不可用时退回内存存储
+        if os.getenv('CONV_SUMMARIZE', 'off').lower() not in ('1', 'on', 'true'):
+            summarizer = None
+        return redis_or_memory('CONV_MEMORY', lambda agent: cls(
+            agent, token_budget=int(os.getenv('CONV_TOKEN_BUDGET', 3000)),
+            ttl=int(os.getenv('CONV_TTL', 7 * 24 * 3600)), summarizer=summarizer))
+
+    def _messages_key(self, session_id):
+        return f'{self.KEY_PREFIX}{session_id}:messages'
+
+    def _summary_key(self, session_id):
+        return f'{self.KEY_PREFIX}{session_id}:summary'
+
+    def append(self, session_id: str, *messages: dict):
+        # 存储时附带估算的token数，加载时无需重新计算
+        entries = [{'role': m['role'], 'content': m['content'],
+                    'tokens': estimate_tokens(m['content'])} for m in messages]
+        return self.backend.append_list(self._messages_key(session_id), entries,
+                                        max_len=self.max_messages, ttl=self.ttl)
+
+    def history(self, session_id: str, token_budget: Optional[int] = None) -> List[dict]:
+        budget = self.token_budget if token_budget is None else token_budget
+        key = self._messages_key(session_id)
+        messages = []
+
+        summary = self.backend.retrieve_data(self._summary_key(session_id))
+        if summary:
+            budget -= estimate_tokens(summary)
+
+        # 从尾部按页向前加载，超出预算即停止，不读取整个历史
+        loaded = 0
+        exhausted = False
+        while not exhausted:
+            page = self.backend.list_range(key, -(loaded + self.PAGE_SIZE), -(loaded + 1))
+            if not page:
+                break
+            for entry in reversed(page):
+                if entry is None:
+                    continue
+                cost = entry.get('tokens') or estimate_tokens(entry['content'])
+                if cost > budget:
+                    exhausted = True
+                    break
+                budget -= cost
+                messages.append({'role': entry['role'], 'content': entry['content']})
+            loaded += len(page)
+            if len(page) < self.PAGE_SIZE:
+                break
+
+        messages.reverse()
+        self._overflow[session_id] = \
+            self.backend.list_length(key) - len(messages) if exhausted else 0
+        if summary:
+            messages.insert(0, {'role': 'system', 'content': summary})
+        return messages
+
+    def compact(self, session_id: str) -> bool:
+        # 把预算外的旧消息交给summarizer压缩成摘要，随后从列表头部删除
+        overflow = self._overflow.get(session_id, 0)
+        if self.summarizer is None or overflow < self.summarize_min:
+            return False
+        key = self._messages_key(session_id)
+        old = [m for m in self.backend.list_range(key, 0, overflow - 1) if m]
+        if not old:
+            return False
+        summary_key = self._summary_key(session_id)
+        try:
+            summary = self.summarizer(self.backend.retrieve_data(summary_key),
+                                      [{'role': m['role'], 'content': m['content']} for m in old])
+        except Exception:
+            return False
+        self.backend.store_data(summary_key, summary, ttl=self.ttl)
+        # 只从头部裁剪，不影响期间追加到尾部的新消息
+        self.backend.trim_list(key, len(old), -1)
+        self._overflow[session_id] = 0
+        return True
+
+    def clear(self, session_id: str):
+        self._overflow.pop(session_id, None)
+        return self.backend.delete_keys(self._messages_key(session_id), self._summary_key(session_id))
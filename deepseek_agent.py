@@ -14,14 +14,24 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import json
 import os
+import sys
+import time
 import requests
-from typing import Optional
+from typing import Iterator, Optional
+
+import tracing
+from conversation_memory import ConversationStore, estimate_tokens
+from llm_cache import LLMResponseCache
 
 class DeepSeekAgent:
-    API_BASE = 'https://api.deepseek.com/v1'
+    API_BASE = os.getenv('DEEPSEEK_API_BASE', 'https://api.deepseek.com/v1')
+    MODEL = 'deepseek-chat'
+    STREAMING = True
+    SUMMARY_PROMPT = '将以下对话压缩为简短摘要，保留事实、结论和未解决的问题：'
     
-    def __init__(self):
+    def __init__(self, cache=None, memory=None, session_id=None):
         if not self.check_dependencies():
             self._install_dependencies()
         
@@ -34,26 +44,141 @@ class DeepSeekAgent:
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         })
+        # 最近一次请求的耗时指标（秒），ttft为首个token到达时间
+        self.metrics = {'ttft': None, 'total_time': None}
+        self.cache = cache if cache is not None else LLMResponseCache.from_env()
+        # 会话历史按token预算裁剪后随请求发送
+        self.memory = memory if memory is not None else ConversationStore.from_env(summarizer=self._summarize)
+        self.session_id = session_id or os.getenv('DEEPSEEK_SESSION', 'default')
 
-    def handle_command(self, params):
+    def handle_command(self, params, stream=False):
         command = params[0] if params else 'help'
         if command == 'chat':
+            if stream:
+                return self._stream_chat(params[1:])
             return self._handle_chat(params[1:])
         return '未知命令，可用命令: chat'
 
+    def _messages(self, args):
+        prompt = {'role': 'user', 'content': ' '.join(args)}
+        if self.memory is None:
+            return [prompt]
+        budget = self.memory.token_budget - estimate_tokens(prompt['content'])
+        return self.memory.history(self.session_id, max(budget, 0)) + [prompt]
+
+    def _remember(self, args, content):
+        if self.memory is None:
+            return
+        self.memory.append(self.session_id,
+                           {'role': 'user', 'content': ' '.join(args)},
+                           {'role': 'assistant', 'content': content})
+        self.memory.compact(self.session_id)
+
+    def _summarize(self, summary, messages):
+        lines = [f"{m['role']}: {m['content']}" for m in messages]
+        if summary:
+            lines.insert(0, f'summary: {summary}')
+        response = self.session.post(
+            f'{self.API_BASE}/chat/completions',
+            json={'model': self.MODEL, 'messages': [
+                {'role': 'system', 'content': self.SUMMARY_PROMPT},
+                {'role': 'user', 'content': '\n'.join(lines)}
+            ]}
+        )
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+    def _chat_payload(self, args, stream=False, messages=None):
+        payload = {
+            'model': self.MODEL,
+            'messages': messages if messages is not None else self._messages(args)
+        }
+        if stream:
+            payload['stream'] = True
+        return payload
+
+    def _cache_key(self, args, messages):
+        # 键覆盖实际发送的全部消息（历史/摘要+本次提问），相同上下文下的相同提问才会命中
+        if self.cache is None:
+            return None
+        payload = self._chat_payload(args, messages=messages)
+        return self.cache.make_key(payload.pop('model'), payload.pop('messages'), **payload)
+
     def _handle_chat(self, args):
+        start = time.perf_counter()
+        messages = self._messages(args)
+        key = self._cache_key(args, messages)
         try:
-            response = self.session.post(
-                f'{self.API_BASE}/chat/completions',
-                json={
-                    'model': 'deepseek-chat',
-                    'messages': [{'role': 'user', 'content': ' '.join(args)}]
-                }
-            )
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            content = self.cache.get(key) if key is not None else None
+            if content is None:
+                with tracing.span('deepseek.http', stream=False, messages=len(messages)):
+                    response = self.session.post(
+                        f'{self.API_BASE}/chat/completions',
+                        json=self._chat_payload(args, messages=messages)
+                    )
+                    response.raise_for_status()
+                    content = response.json()['choices'][0]['message']['content']
+                if key is not None:
+                    self.cache.set(key, content)
+            self._remember(args, content)
+            return content
         except requests.exceptions.RequestException as e:
             return f'API请求失败: {str(e)}'
+        finally:
+            self.metrics['ttft'] = self.metrics['total_time'] = time.perf_counter() - start
+
+    def _stream_chat(self, args) -> Iterator[str]:
+        # 以SSE方式读取增量结果，每收到一个片段立即产出
+        start = time.perf_counter()
+        self.metrics['ttft'] = None
+        messages = self._messages(args)
+        key = self._cache_key(args, messages)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.metrics['ttft'] = self.metrics['total_time'] = time.perf_counter() - start
+                self._remember(args, cached)
+                yield cached
+                return
+        chunks = []
+        try:
+            with tracing.span('deepseek.http', stream=True, messages=len(messages)) as current, self.session.post(
+                f'{self.API_BASE}/chat/completions',
+                json=self._chat_payload(args, stream=True, messages=messages),
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                for raw_line in response.iter_lines(chunk_size=None):
+                    # SSE未声明charset时requests会按latin-1解码，这里按utf-8自行解码
+                    line = raw_line.decode('utf-8')
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    choices = json.loads(data).get('choices') or [{}]
+                    content = choices[0].get('delta', {}).get('content')
+                    if content:
+                        if self.metrics['ttft'] is None:
+                            self.metrics['ttft'] = time.perf_counter() - start
+                            current.set(ttft=self.metrics['ttft'])
+                        chunks.append(content)
+                        yield content
+            if chunks:
+                content = ''.join(chunks)
+                if key is not None:
+                    self.cache.set(key, content)
+                self._remember(args, content)
+        except requests.exceptions.RequestException as e:
+            yield f'API请求失败: {str(e)}'
+        finally:
+            self.metrics['total_time'] = time.perf_counter() - start
+
+    def chat_many(self, prompts, concurrency=8):
+        # 批量请求走异步客户端，并发受信号量限制，结果按输入顺序返回
+        from async_deepseek import run_batch
+        return run_batch(prompts, concurrency=concurrency,
+                         api_key=self.api_key, api_base=self.API_BASE, model=self.MODEL)
 
     def check_dependencies(self):
         try:
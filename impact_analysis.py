@@ -0,0 +1,158 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import re
+import subprocess
+from typing import Dict, List, Optional
+
+import tracing
+from agent_cache import cache_path, load_json, save_json
+
+
+class ImpactAnalyzer:
+    SUITE_FILES = ('testcase.yaml', 'sample.yaml')
+    SKIP_DIRS = {'.git', 'build', 'twister-out', 'node_modules', '__pycache__'}
+    # 这些目录的改动可能影响任意测试，即使能对应到个别用例也回退为全量测试
+    GLOBAL_PREFIXES = ('arch/', 'boards/', 'cmake/', 'dts/', 'include/', 'scripts/', 'soc/')
+    IGNORED_PREFIXES = ('doc/', '.github/')
+    IGNORED_SUFFIXES = ('.rst', '.md', '.txt.license')
+    SOURCE_SUFFIXES = ('.c', '.cpp', '.cc', '.h', '.hpp', '.S', '.s', '.ld', '.cmake')
+
+    _CMAKE_CALL = re.compile(
+        r'\b(target_sources|zephyr_library_sources|zephyr_sources|file|include_directories|'
+        r'zephyr_include_directories|target_include_directories|zephyr_library_include_directories)'
+        r'\s*\((.*?)\)', re.IGNORECASE | re.DOTALL)
+
+    def __init__(self, project_path: str):
+        self.project_path = os.path.abspath(project_path)
+
+    def _git(self, *args) -> str:
+        return tracing.run(['git'] + list(args), cwd=self.project_path,
+                           check=True, capture_output=True, text=True).stdout.strip()
+
+    def default_base(self) -> str:
+        try:
+            return self._git('rev-parse', '--abbrev-ref', 'origin/HEAD')
+        except subprocess.CalledProcessError:
+            return 'origin/main'
+
+    def changed_files(self, base_ref: Optional[str] = None) -> List[str]:
+        # 三点diff：只比较PR分支相对合并基点的改动
+        output = self._git('diff', '--name-only', f'{base_ref or self.default_base()}...HEAD')
+        return [line for line in output.splitlines() if line]
+
+    def build_index(self) -> Dict[str, object]:
+        commit = self._git('rev-parse', 'HEAD')
+        project_key = hashlib.sha1(self.project_path.encode()).hexdigest()[:12]
+        index_file = cache_path('impact_index', project_key, f'{commit}.json')
+        index = load_json(index_file)
+        if index is not None:
+            return index
+
+        suites, files, dirs = [], {}, {}
+        for root, dirnames, filenames in os.walk(self.project_path):
+            dirnames[:] = [d for d in dirnames if d not in self.SKIP_DIRS]
+            if not any(name in filenames for name in self.SUITE_FILES):
+                continue
+            suite = self._relpath(root)
+            suites.append(suite)
+            cmake_file = os.path.join(root, 'CMakeLists.txt')
+            if os.path.isfile(cmake_file):
+                for path, is_dir in self._cmake_references(cmake_file, root):
+                    target = dirs if is_dir else files
+                    target.setdefault(path, []).append(suite)
+
+        index = {'commit': commit, 'suites': sorted(suites), 'files': files, 'dirs': dirs}
+        try:
+            save_json(index_file, index)
+        except OSError:
+            pass
+        return index
+
+    def affected_suites(self, base_ref: Optional[str] = None) -> Optional[List[str]]:
+        # 返回受影响的测试目录；返回None表示需要全量测试，[]表示只有文档等可忽略的改动
+        try:
+            changed_files = self.changed_files(base_ref)
+            index = self.build_index()
+        except (subprocess.CalledProcessError, OSError):
+            # 浅克隆等情况下找不到合并基点，无法判断改动范围，回退为全量测试
+            return None
+        affected = set()
+        for changed in changed_files:
+            if changed.startswith(self.IGNORED_PREFIXES) or changed.endswith(self.IGNORED_SUFFIXES):
+                continue
+            if changed.startswith(self.GLOBAL_PREFIXES) or '/' not in changed:
+                return None
+            matched = self._match(changed, index)
+            if not matched:
+                # 无法对应到任何用例的改动一律保守处理，回退为全量测试
+                return None
+            affected.update(matched)
+        return sorted(affected)
+
+    def _match(self, changed: str, index: dict) -> List[str]:
+        matched = [s for s in index['suites'] if changed.startswith(s + '/')]
+        matched += index['files'].get(changed, [])
+        matched += [s for d, suites in index['dirs'].items()
+                    if changed.startswith(d + '/') for s in suites]
+        if matched:
+            return matched
+        # 约定：subsys/logging/x.c 对应 tests/subsys/logging 下的用例
+        parts = changed.split('/')[:-1]
+        while parts:
+            prefix = 'tests/' + '/'.join(parts) + '/'
+            hits = [s for s in index['suites'] if (s + '/').startswith(prefix)]
+            if hits:
+                return hits
+            parts.pop()
+        return []
+
+    def _cmake_references(self, cmake_file: str, suite_dir: str):
+        try:
+            with open(cmake_file, 'r', encoding='utf-8', errors='replace') as f:
+                content = re.sub(r'#[^\n]*', '', f.read())
+        except OSError:
+            return
+        for call, body in self._CMAKE_CALL.findall(content):
+            is_include = 'include' in call.lower()
+            for token in body.split():
+                token = token.strip('"')
+                if not is_include and not token.endswith(self.SOURCE_SUFFIXES) and '*' not in token:
+                    continue
+                path = self._resolve(token, suite_dir)
+                if path is None:
+                    continue
+                if is_include or '*' in token:
+                    yield (path.split('*')[0].rstrip('/') if '*' in path else path), True
+                else:
+                    yield path, False
+
+    def _resolve(self, token: str, suite_dir: str) -> Optional[str]:
+        for var in ('${ZEPHYR_BASE}', '$ENV{ZEPHYR_BASE}'):
+            if token.startswith(var):
+                return token[len(var):].lstrip('/')
+        for var in ('${CMAKE_CURRENT_SOURCE_DIR}', '${CMAKE_CURRENT_LIST_DIR}', '${APPLICATION_SOURCE_DIR}'):
+            if token.startswith(var):
+                token = token[len(var):].lstrip('/')
+        if '${' in token or os.path.isabs(token):
+            return None
+        path = self._relpath(os.path.normpath(os.path.join(suite_dir, token)))
+        return None if path.startswith('..') else path
+
+    def _relpath(self, path: str) -> str:
+        return os.path.relpath(path, self.project_path).replace(os.sep, '/')
@@ -0,0 +1,89 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_INLINE_FLAGS = re.compile(r'^\(\?[aiLmsux]+\)')
+
+
+def _strip_flags(pattern: str) -> str:
+    # 合并后的正则统一使用IGNORECASE，去掉各模式开头的内联标志
+    return _INLINE_FLAGS.sub('', pattern)
+
+
+class IntentIndex:
+    DEFAULT_CACHE_SIZE = 4096
+
+    def __init__(self,
+                 agent_patterns: Dict[str, Sequence[str]],
+                 command_patterns: Sequence[Tuple[str, str]],
+                 param_extractors: Dict[str, Dict[str, Callable[[str], List[str]]]],
+                 default_agent: str = 'cody',
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.default_agent = default_agent
+        self.param_extractors = param_extractors
+        self._agents = list(agent_patterns)
+        self._commands = [cmd for _pattern, cmd in command_patterns]
+
+        # 每个分支是一个前瞻断言：按注册顺序尝试，第一个命中的智能体胜出，
+        # 与逐个re.search的优先级一致，但只需一次match调用
+        agent_branches = []
+        for i, agent in enumerate(self._agents):
+            alternation = '|'.join('(?:{})'.format(_strip_flags(p)) for p in agent_patterns[agent])
+            agent_branches.append(r'(?=.*?(?:{}))(?P<a{}>)'.format(alternation, i))
+        command_branches = [
+            r'(?=.*?(?:{}))(?P<c{}>)'.format(_strip_flags(pattern), i)
+            for i, (pattern, _cmd) in enumerate(command_patterns)
+        ]
+
+        combined = ''
+        if agent_branches:
+            combined += '(?:{})?'.format('|'.join(agent_branches))
+        if command_branches:
+            combined += '(?:{})?'.format('|'.join(command_branches))
+        self._regex = re.compile(combined, re.IGNORECASE | re.DOTALL)
+        self._agent_groups = ['a{}'.format(i) for i in range(len(self._agents))]
+        self._command_groups = ['c{}'.format(i) for i in range(len(self._commands))]
+
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, query: str) -> Tuple[str, Tuple[str, ...]]:
+        match = self._regex.match(query)
+        agent = next((name for name, group in zip(self._agents, self._agent_groups)
+                      if match.group(group) is not None), None)
+        if agent is None:
+            return self.default_agent, ()
+        command = next((cmd for cmd, group in zip(self._commands, self._command_groups)
+                        if match.group(group) is not None), None)
+        return agent, tuple(self.extract(agent, query, command))
+
+    def extract(self, agent: str, query: str, command: Optional[str] = None) -> List[str]:
+        extractors = self.param_extractors.get(agent, {})
+        if command is None:
+            match = self._regex.match(query)
+            command = next((cmd for cmd, group in zip(self._commands, self._command_groups)
+                            if match.group(group) is not None), None)
+        if command in extractors:
+            return extractors[command](query)
+        # 只有单一命令的智能体（如deepseek的chat）直接使用该命令
+        if len(extractors) == 1:
+            return next(iter(extractors.values()))(query)
+        return []
+
+    def cache_info(self):
+        return self.classify.cache_info()
@@ -0,0 +1,124 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+
+@dataclass
+class Job:
+    id: int
+    description: str
+    argv: List[str]
+    status: str = 'queued'
+    returncode: Optional[int] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    tail: deque = field(default_factory=lambda: deque(maxlen=50))
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+
+
+class JobManager:
+    def __init__(self, max_concurrency: int = 2,
+                 on_output: Optional[Callable[[Job, str], None]] = None,
+                 on_finish: Optional[Callable[[Job], None]] = None):
+        # 超出并发上限的任务排队等待
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._ids = itertools.count(1)
+        self.jobs = OrderedDict()
+        self.on_output = on_output
+        self.on_finish = on_finish
+
+    def submit(self, description: str, argv: List[str]) -> Job:
+        job = Job(next(self._ids), description, list(argv))
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self.jobs[job.id] = job
+        return job
+
+    async def _run(self, job: Job):
+        process = None
+        try:
+            async with self._semaphore:
+                job.status = 'running'
+                job.started = time.time()
+                process = await asyncio.create_subprocess_exec(
+                    *job.argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+                # 逐行读取子进程输出作为进度
+                async for raw in process.stdout:
+                    line = raw.decode('utf-8', errors='replace')
+                    job.tail.append(line)
+                    if self.on_output:
+                        self.on_output(job, line)
+                job.returncode = await process.wait()
+                job.status = 'done' if job.returncode == 0 else 'failed'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+            if process is not None and process.returncode is None:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=10)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    # kill之后仍需等待进程退出，否则returncode可能还是None
+                    await process.wait()
+                job.returncode = process.returncode
+        except OSError as e:
+            job.status = 'failed'
+            job.tail.append(str(e))
+        finally:
+            job.finished = time.time()
+            if self.on_finish:
+                self.on_finish(job)
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: int) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.task.cancel()
+        return True
+
+    async def wait(self, job_id: Optional[int] = None):
+        if job_id is not None:
+            tasks = [self.jobs[job_id].task] if job_id in self.jobs else []
+        else:
+            tasks = [job.task for job in self.jobs.values() if not job.done]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def active(self) -> List[Job]:
+        return [job for job in self.jobs.values() if not job.done]
+
+    async def shutdown(self):
+        for job in self.active():
+            job.task.cancel()
+        await self.wait()
@@ -0,0 +1,129 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from agent_cache import redis_or_memory
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class LLMResponseCache:
+    KEY_PREFIX = 'llmcache:'
+    INDEX_KEY = 'llmcache:index'
+
+    def __init__(self, redis_agent=None, ttl: int = 24 * 3600, max_entries: int = 10000,
+                 local_size: int = 256):
+        # redis_agent为None时仅使用进程内LRU
+        self.redis_agent = redis_agent
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+
+    @classmethod
+    def from_env(cls):
+        # LLM_CACHE=off|memory|redis，redis不可用时退回内存缓存
+        return redis_or_memory('LLM_CACHE', lambda agent: cls(
+            agent, ttl=int(os.getenv('LLM_CACHE_TTL', 24 * 3600))))
+
+    @classmethod
+    def make_key(cls, model: str, messages: List[dict], **params) -> str:
+        # 规范化空白和角色，格式差异不同但内容相同的提问命中同一条缓存
+        normalised = [
+            {'role': str(m.get('role', 'user')).lower(),
+             'content': _WHITESPACE.sub(' ', str(m.get('content', ''))).strip()}
+            for m in messages
+        ]
+        raw = json.dumps({'model': model, 'messages': normalised, 'params': params},
+                         sort_keys=True, ensure_ascii=False)
+        return cls.KEY_PREFIX + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._local.move_to_end(key)
+                    self.stats['local_hits'] += 1
+                    return value
+                del self._local[key]
+
+        if self.redis_agent is not None:
+            value = self.redis_agent.retrieve_data(key)
+            if value is not None:
+                self._touch_index(key, now)
+                self._store_local(key, value, now)
+                with self._lock:
+                    self.stats['redis_hits'] += 1
+                return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        self._store_local(key, value, now)
+        if self.redis_agent is not None and self.redis_agent.store_data(key, value, ttl=self.ttl):
+            self._touch_index(key, now)
+            self._evict(now)
+
+    def get_or_compute(self, model: str, messages: List[dict], compute: Callable[[], str],
+                       **params) -> str:
+        key = self.make_key(model, messages, **params)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _store_local(self, key: str, value: str, now: float):
+        with self._lock:
+            self._local[key] = (now + self.ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _touch_index(self, key: str, now: float):
+        # 有序集合按最近访问时间记录缓存键，用于容量淘汰
+        try:
+            self.redis_agent.client.zadd(self.INDEX_KEY, {key: now})
+        except Exception:
+            pass
+
+    def _evict(self, now: float):
+        try:
+            client = self.redis_agent.client
+            client.zremrangebyscore(self.INDEX_KEY, '-inf', now - self.ttl)
+            overflow = client.zcard(self.INDEX_KEY) - self.max_entries
+            if overflow > 0:
+                stale = [k for k, _score in client.zpopmin(self.INDEX_KEY, overflow)]
+                if stale:
+                    client.delete(*stale)
+        except Exception:
+            pass
@@ -0,0 +1,357 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import ast
+import builtins
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from agent_cache import CACHE_ROOT
+
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+DEFAULT_LOCALE = 'en-US'
+
+# 文件布局：头部 | 按键排序的定长索引表 | 键值UTF-8数据
+MAGIC = b'ZLC1'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sII32s')
+_ENTRY = struct.Struct('<IIII')
+
+
+def available_locales() -> List[str]:
+    locales = {os.path.splitext(os.path.basename(p))[0]
+               for p in glob.glob(os.path.join(LOCALE_DIR, '*.json'))}
+    for po_dir in glob.glob(os.path.join(LOCALE_DIR, '*', 'LC_MESSAGES')):
+        lang = os.path.basename(os.path.dirname(po_dir))
+        if not any(locale.split('-')[0] == lang for locale in locales):
+            locales.add(lang)
+    return sorted(locales)
+
+
+def source_files(locale: str) -> List[str]:
+    # .po按语言目录匹配（zh对应zh-CN），排在前面，同名键以JSON为准
+    lang = locale.split('-')[0]
+    sources = []
+    for name in sorted({lang, locale}):
+        sources += sorted(glob.glob(os.path.join(LOCALE_DIR, name, 'LC_MESSAGES', '*.po')))
+    json_file = os.path.join(LOCALE_DIR, f'{locale}.json')
+    if os.path.exists(json_file):
+        sources.append(json_file)
+    return sources
+
+
+def fingerprint(sources: List[str]) -> bytes:
+    # 只用stat信息判断源文件是否变化，无需读取内容
+    digest = hashlib.sha256(str(FORMAT_VERSION).encode())
+    for path in sources:
+        st = os.stat(path)
+        digest.update(f'{path}\0{st.st_mtime_ns}\0{st.st_size}\0'.encode('utf-8'))
+    return digest.digest()
+
+
+def _flatten(data: dict, prefix: str = '') -> Iterator[Tuple[str, str]]:
+    for key, value in data.items():
+        full_key = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from _flatten(value, full_key + '.')
+        else:
+            yield full_key, str(value)
+
+
+def parse_po(path: str) -> Dict[str, str]:
+    messages = {}
+    msgid = msgstr = None
+    current = None
+
+    def _flush():
+        if msgid and msgstr:
+            messages[msgid] = msgstr
+
+    with open(path, encoding='utf-8') as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('msgid '):
+                _flush()
+                msgid, msgstr, current = ast.literal_eval(line[6:]), None, 'msgid'
+            elif line.startswith('msgstr '):
+                msgstr, current = ast.literal_eval(line[7:]), 'msgstr'
+            elif line.startswith('"'):
+                # 多行字符串续行
+                if current == 'msgid':
+                    msgid += ast.literal_eval(line)
+                elif current == 'msgstr':
+                    msgstr += ast.literal_eval(line)
+    _flush()
+    return messages
+
+
+def load_sources(locale: str) -> Dict[str, str]:
+    messages = {}
+    for path in source_files(locale):
+        if path.endswith('.po'):
+            messages.update(parse_po(path))
+        else:
+            with open(path, encoding='utf-8') as f:
+                messages.update(_flatten(json.load(f)))
+    return messages
+
+
+def compile_catalog(messages: Dict[str, str], output: str, source_hash: bytes):
+    items = sorted((k.encode('utf-8'), v.encode('utf-8')) for k, v in messages.items())
+    blob_start = _HEADER.size + _ENTRY.size * len(items)
+    table = bytearray()
+    blob = bytearray()
+    for key, value in items:
+        key_off = blob_start + len(blob)
+        blob += key
+        val_off = blob_start + len(blob)
+        blob += value
+        table += _ENTRY.pack(key_off, len(key), val_off, len(value))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(output), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(items), source_hash))
+            f.write(table)
+            f.write(blob)
+        # 原子替换，其他进程已映射的旧文件不受影响
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Catalog:
+    def __init__(self, locale: str):
+        self.locale = locale
+        # 这里不创建目录：缓存目录不可写时也不能影响_()的使用
+        self.path = os.path.join(CACHE_ROOT, 'locales', f'{locale}.cat')
+        self.sources = source_files(locale)
+        self.fingerprint = fingerprint(self.sources)
+        # 无法编译或写入缓存时退回到内存中的字典
+        self._fallback = None
+        self._map = self._open()
+        self._count = _HEADER.unpack_from(self._map)[2] if self._map is not None else 0
+        self._memo = {}
+
+    def _open(self) -> Optional[mmap.mmap]:
+        if not self.sources:
+            return None
+        data = self._map_file()
+        if data is None:
+            # 源文件有变化或尚未编译时重新生成
+            messages = load_sources(self.locale)
+            try:
+                compile_catalog(messages, self.path, self.fingerprint)
+            except OSError:
+                self._fallback = messages
+                return None
+            data = self._map_file()
+            if data is None:
+                self._fallback = messages
+        return data
+
+    def _map_file(self) -> Optional[mmap.mmap]:
+        try:
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        # 截断或损坏的文件视为过期，重新编译
+        if len(data) < _HEADER.size:
+            data.close()
+            return None
+        magic, version, count, source_hash = _HEADER.unpack_from(data)
+        if (magic != MAGIC or version != FORMAT_VERSION or source_hash != self.fingerprint
+                or len(data) < _HEADER.size + count * _ENTRY.size):
+            data.close()
+            return None
+        return data
+
+    def _key_at(self, i: int) -> bytes:
+        key_off, key_len, _val_off, _val_len = _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+        return self._map[key_off:key_off + key_len]
+
+    def get(self, key: str) -> Optional[str]:
+        if self._fallback is not None:
+            return self._fallback.get(key)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        target = key.encode('utf-8')
+        lo, hi = 0, self._count
+        value = None
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self._key_at(mid)
+            if current < target:
+                lo = mid + 1
+            elif current > target:
+                hi = mid
+            else:
+                _k, _kl, val_off, val_len = _ENTRY.unpack_from(self._map, _HEADER.size + mid * _ENTRY.size)
+                value = self._map[val_off:val_off + val_len].decode('utf-8')
+                break
+        self._memo[key] = value
+        return value
+
+    def __len__(self) -> int:
+        return len(self._fallback) if self._fallback is not None else self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> Iterator[str]:
+        if self._fallback is not None:
+            yield from sorted(self._fallback)
+            return
+        for i in range(self._count):
+            yield self._key_at(i).decode('utf-8')
+
+    @property
+    def version(self) -> str:
+        return self.fingerprint.hex()[:16]
+
+
+def detect_locale() -> str:
+    # ZEPHYR_AGENT_LANG优先，其次按gettext的顺序读取LANGUAGE/LC_ALL/LC_MESSAGES/LANG
+    available = available_locales()
+    for var in ('ZEPHYR_AGENT_LANG', 'LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG'):
+        value = os.getenv(var)
+        if not value:
+            continue
+        for candidate in value.split(':'):
+            name = candidate.split('.')[0].split('@')[0].replace('_', '-')
+            if not name or name in ('C', 'POSIX'):
+                continue
+            for locale in available:
+                if locale.lower() == name.lower():
+                    return locale
+            lang = name.split('-')[0].lower()
+            for locale in available:
+                if locale.split('-')[0].lower() == lang:
+                    return locale
+    return DEFAULT_LOCALE
+
+
+_lock = threading.Lock()
+_catalogs: Dict[str, Catalog] = {}
+_locale: Optional[str] = None
+
+
+def catalog(locale: Optional[str] = None) -> Catalog:
+    locale = locale or current_locale()
+    cat = _catalogs.get(locale)
+    if cat is None:
+        with _lock:
+            cat = _catalogs.get(locale)
+            if cat is None:
+                cat = _catalogs[locale] = Catalog(locale)
+    return cat
+
+
+def current_locale() -> str:
+    global _locale
+    if _locale is None:
+        _locale = detect_locale()
+    return _locale
+
+
+def set_locale(locale: Optional[str]):
+    global _locale
+    _locale = locale
+
+
+def version() -> str:
+    # 当前语言目录的版本，依赖翻译文本的缓存（如意图正则）以此为键
+    return f'{current_locale()}:{catalog().version}'
+
+
+def gettext(key: str) -> str:
+    # 首次调用时才打开编译好的目录；缺失的键回退到默认语言，再回退为键本身
+    value = catalog().get(key)
+    if value is None and current_locale() != DEFAULT_LOCALE:
+        value = catalog(DEFAULT_LOCALE).get(key)
+    return key if value is None else value
+
+
+def install():
+    builtins._ = gettext
+
+
+_KEY_PATTERN = re.compile(r'''\b_\(\s*(['"])([A-Za-z0-9_.]+)\1\s*\)''')
+
+
+def used_keys(root: str) -> Dict[str, List[str]]:
+    # 扫描代码中的_('...')字面量，返回键及其位置
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in ('node_modules', '__pycache__')]
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    for match in _KEY_PATTERN.finditer(line):
+                        found.setdefault(match.group(2), []).append(
+                            f'{os.path.relpath(path, root)}:{line_no}')
+    return found
+
+
+def check(root: str, locales: Optional[List[str]] = None) -> int:
+    keys = used_keys(root)
+    missing_total = 0
+    for locale in locales or available_locales():
+        cat = catalog(locale)
+        missing = sorted(key for key in keys if key not in cat)
+        missing_total += len(missing)
+        for key in missing:
+            print(f'{locale}: missing {key} (used at {", ".join(keys[key])})')
+    print(f'{len(keys)} keys checked, {missing_total} missing')
+    return 1 if missing_total else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile and check the translation catalogs')
+    parser.add_argument('--check', action='store_true',
+                        help='report _() keys used in the code that are missing from a catalog')
+    parser.add_argument('--locale', action='append', help='limit to these locales')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args(argv)
+    if args.check:
+        return check(args.root, args.locale)
+    for locale in args.locale or available_locales():
+        cat = catalog(locale)
+        print(f'{locale}: {len(cat)} messages -> {cat.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import mmap
+import os
+import re
+import subprocess
+import sys
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+
+import tracing
+from agent_cache import cache_path, load_json, save_json
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+MESSAGE_LIMIT = 300
+
+# (类别, 正则)；severity优先取正则中的分组，否则视为error
+RULES = [
+    ('compiler', re.compile(r'^(?P<file>[^\s:][^:]*):(?P<line>\d+):(?:\d+:)?\s*'
+                            r'(?P<severity>fatal error|error|warning):\s*(?P<message>.*)')),
+    ('linker', re.compile(r'(?P<message>.*(?:undefined reference to|multiple definition of|'
+                          r'region `\S+\' overflowed).*)')),
+    ('cmake', re.compile(r'^CMake (?P<severity>Error|Warning)(?: \(dev\))?'
+                         r'(?: at (?P<file>[^:]+):(?P<line>\d+))?(?P<message>.*)')),
+    ('devicetree', re.compile(r'^devicetree error: (?P<message>.*)')),
+    ('build', re.compile(r'^FAILED: (?P<message>.*)')),
+    ('no_tests', re.compile(r'(?P<message>No tests (?:found|to run).*)')),
+    ('test', re.compile(r'^(?:\S+\s+)?(?:INFO|ERROR)\s+-\s+\d+/\d+\s+(?P<platform>\S+)\s+'
+                        r'(?P<file>\S+)\s+(?P<severity>FAILED|ERROR)\b\s*:?\s*(?P<message>.*)')),
+    ('git', re.compile(r'^(?P<severity>fatal|error): (?P<message>.*)')),
+]
+# 先做廉价的子串过滤，绝大多数普通输出行不会进入正则匹配
+_KEYWORDS = ('error', 'warning', 'failed', 'fatal', 'undefined reference',
+             'multiple definition', 'overflowed', 'no tests')
+
+
+def classify_line(line: str) -> Optional[dict]:
+    lowered = line.lower()
+    if not any(keyword in lowered for keyword in _KEYWORDS):
+        return None
+    for category, pattern in RULES:
+        match = pattern.search(line)
+        if match:
+            fields = match.groupdict()
+            severity = (fields.get('severity') or 'error').lower()
+            entry = {
+                'category': category,
+                'severity': 'warning' if severity == 'warning' else 'error',
+                'message': (fields.get('message') or line).strip()[:MESSAGE_LIMIT],
+            }
+            if fields.get('file'):
+                entry['file'] = fields['file']
+            if fields.get('line'):
+                entry['line'] = int(fields['line'])
+            if fields.get('platform'):
+                entry['platform'] = fields['platform']
+            return entry
+    return None
+
+
+class LogWriter:
+    """将输出逐行写入日志文件，同时把识别出的错误/警告追加到.idx索引"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backups: int = DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.counts = Counter()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        for segment, index in LogIndex(path).segments():
+            os.remove(segment)
+            if os.path.exists(index):
+                os.remove(index)
+        self._open()
+
+    def _open(self):
+        self._log = open(self.path, 'wb')
+        self._index = open(self.path + '.idx', 'w', encoding='utf-8')
+        self._offset = 0
+        self._line_no = 0
+
+    def _rotate(self):
+        # 与RotatingFileHandler相同：build.log -> build.log.1 -> ...，索引随日志一起轮转
+        self._log.close()
+        self._index.close()
+        for i in range(self.backups - 1, 0, -1):
+            for suffix in ('', '.idx'):
+                src = f'{self.path}.{i}{suffix}'
+                if os.path.exists(src):
+                    os.replace(src, f'{self.path}.{i + 1}{suffix}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+            os.replace(self.path + '.idx', f'{self.path}.1.idx')
+        self._open()
+
+    def write(self, raw: bytes):
+        if self.max_bytes and self._offset and self._offset + len(raw) > self.max_bytes:
+            self._rotate()
+        self._line_no += 1
+        entry = classify_line(raw.decode('utf-8', errors='replace').rstrip('\r\n'))
+        if entry is not None:
+            entry.update(offset=self._offset, length=len(raw), line_no=self._line_no)
+            self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._index.flush()
+            self.counts[entry['severity']] += 1
+        self._log.write(raw)
+        self._offset += len(raw)
+
+    def close(self):
+        self._log.close()
+        self._index.close()
+        # 记录最近一次的日志，供`zephyr logs`默认查看
+        try:
+            save_json(cache_path('logs', 'last.json'), {'path': os.path.abspath(self.path)})
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class LogIndex:
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def last(cls) -> Optional['LogIndex']:
+        path = load_json(cache_path('logs', 'last.json'), {}).get('path')
+        return cls(path) if path and os.path.exists(path) else None
+
+    def segments(self) -> List[tuple]:
+        # 从最旧的轮转文件到当前文件
+        found = []
+        i = 1
+        while os.path.exists(f'{self.path}.{i}'):
+            found.append((f'{self.path}.{i}', f'{self.path}.{i}.idx'))
+            i += 1
+        found.reverse()
+        if os.path.exists(self.path):
+            found.append((self.path, self.path + '.idx'))
+        return found
+
+    def entries(self, severity: Optional[str] = None,
+                category: Optional[str] = None) -> Iterator[dict]:
+        for segment, index in self.segments():
+            if not os.path.exists(index):
+                continue
+            with open(index, encoding='utf-8') as f:
+                for raw in f:
+                    entry = json.loads(raw)
+                    if severity and entry['severity'] != severity:
+                        continue
+                    if category and entry['category'] != category:
+                        continue
+                    entry['log'] = segment
+                    yield entry
+
+    def summary(self) -> Counter:
+        return Counter((e['category'], e['severity']) for e in self.entries())
+
+    def slice(self, entry: dict, before: int = 3, after: int = 10) -> str:
+        # 通过mmap只读取条目前后若干行，不加载整个日志
+        with open(entry['log'], 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = entry['offset']
+                for _i in range(before):
+                    if start <= 0:
+                        break
+                    start = data.rfind(b'\n', 0, start - 1) + 1
+                end = entry['offset'] + entry['length']
+                for _i in range(after):
+                    if end >= len(data):
+                        break
+                    next_end = data.find(b'\n', end)
+                    end = len(data) if next_end < 0 else next_end + 1
+                return data[start:end].decode('utf-8', errors='replace')
+
+    def context_for_llm(self, max_chars: int = 4000, before: int = 3, after: int = 10,
+                        severity: str = 'error') -> str:
+        # 按出现顺序拼接错误片段，相同位置的重复错误只取一次，总长度受限
+        parts = []
+        used = 0
+        seen = set()
+        for entry in self.entries(severity=severity):
+            location = (entry.get('file'), entry.get('line'), entry['message'])
+            if location in seen:
+                continue
+            seen.add(location)
+            part = f"--- {entry['category']}: {entry['message']}\n{self.slice(entry, before, after)}"
+            if used + len(part) > max_chars:
+                if not parts:
+                    parts.append(part[:max_chars])
+                break
+            parts.append(part)
+            used += len(part)
+        return '\n'.join(parts)
+
+
+class LoggedProcessError(subprocess.CalledProcessError):
+    def __init__(self, returncode, cmd, log_index: LogIndex):
+        super().__init__(returncode, cmd, stderr=log_index.context_for_llm(max_chars=2000))
+        self.log_index = log_index
+
+
+@dataclass
+class LoggedRun:
+    returncode: int
+    log_index: LogIndex
+    tail: List[str]
+
+
+def run_logged(cmd: List[str], log_path: str, cwd: Optional[str] = None, env=None,
+               echo: Optional[Callable[[str], None]] = None, check: bool = True,
+               tail_lines: int = 50, max_bytes: int = DEFAULT_MAX_BYTES,
+               backups: int = DEFAULT_BACKUPS) -> LoggedRun:
+    # 输出逐行落盘并建立索引，内存中只保留最后tail_lines行
+    tail = deque(maxlen=tail_lines)
+    with tracing.span('subprocess', cmd=tracing.command_name(cmd)) as current:
+        with LogWriter(log_path, max_bytes, backups) as writer, \
+                tracing.popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT) as process:
+            for raw in process.stdout:
+                writer.write(raw)
+                line = raw.decode('utf-8', errors='replace')
+                tail.append(line)
+                if echo:
+                    echo(line)
+        returncode = process.returncode
+        current.set(returncode=returncode, errors=writer.counts['error'],
+                    warnings=writer.counts['warning'])
+        tracing.record_rusage(current, process)
+    log_index = LogIndex(log_path)
+    if check and returncode:
+        raise LoggedProcessError(returncode, cmd, log_index)
+    return LoggedRun(returncode, log_index, list(tail))
+
+
+def echo_stdout(line: str):
+    sys.stdout.write(line)
+    sys.stdout.flush()
@@ -14,10 +14,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from cli import CodyCLI
-from redis_agent import RedisAgent
-
 if __name__ == "__main__":
+    # 仅在实际运行时导入redis依赖
+    from redis_agent import RedisAgent
+
     # 初始化Redis智能体
     agent = RedisAgent()
     
@@ -0,0 +1,91 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import tracing
+from agent_cache import cache_path, load_json, save_json
+
+
+class ManifestFingerprint:
+    LIST_FORMAT = '{name}|{revision}|{abspath}|{url}'
+
+    def __init__(self, workspace_path: str):
+        self.workspace_path = os.path.abspath(workspace_path)
+        key = hashlib.sha1(self._topdir().encode()).hexdigest()[:12]
+        self.store_file = cache_path('west', f'{key}.json')
+
+    def _topdir(self) -> str:
+        return tracing.run(['west', 'topdir'], cwd=self.workspace_path, check=True,
+                           capture_output=True, text=True).stdout.strip()
+
+    def resolved_projects(self) -> Dict[str, dict]:
+        # west list会解析west.yml及其全部import，无需联网
+        output = tracing.run(['west', 'list', '-f', self.LIST_FORMAT],
+                             cwd=self.workspace_path, check=True,
+                             capture_output=True, text=True).stdout
+        projects = {}
+        for line in output.splitlines():
+            name, revision, path, url = (line.split('|') + ['', '', ''])[:4]
+            projects[name] = {'revision': revision, 'path': path, 'url': url}
+        return projects
+
+    def checked_out(self, projects: Dict[str, dict]) -> Dict[str, Optional[str]]:
+        def _head(item):
+            name, project = item
+            try:
+                return name, tracing.run(['git', 'rev-parse', 'HEAD'], cwd=project['path'],
+                                         check=True, capture_output=True,
+                                         text=True).stdout.strip()
+            except (subprocess.CalledProcessError, OSError):
+                return name, None
+
+        with ThreadPoolExecutor(max_workers=min(32, max(1, len(projects)))) as pool:
+            return dict(pool.map(tracing.propagate(_head), projects.items()))
+
+    def plan(self) -> Optional[List[str]]:
+        # 返回需要更新的项目列表；空列表表示可跳过，None表示需要完整更新
+        stored = load_json(self.store_file)
+        if not stored:
+            return None
+        current = self.resolved_projects()
+        heads = self.checked_out(current)
+        previous = stored.get('projects', {})
+        changed = []
+        for name, project in current.items():
+            if name == 'manifest':
+                continue
+            old = previous.get(name)
+            if (old is None or old.get('revision') != project['revision']
+                    or old.get('url') != project['url'] or heads.get(name) is None
+                    or heads.get(name) != old.get('head')):
+                changed.append(name)
+        return changed
+
+    def record(self):
+        projects = self.resolved_projects()
+        heads = self.checked_out(projects)
+        for name, project in projects.items():
+            project['head'] = heads.get(name)
+        try:
+            save_json(self.store_file, {'projects': projects})
+        except OSError:
+            # 缓存不可写时下次执行完整更新
+            pass
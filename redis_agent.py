@@ -15,12 +15,51 @@ limitations under the License.
 """
 
 import redis
-import json
+import os
+import threading
+
+import tracing
+from chain_registry import default_registry
+from llm_cache import LLMResponseCache
+from serializers import get_serializer
 
 class RedisAgent:
-    def __init__(self, host='localhost', port=6379, db=0):
-        self.client = redis.Redis(host=host, port=port, db=db)
-        self._check_connection()
+    PROMPT_TEMPLATE = """基于以下用户输入生成响应：
+            {query}
+            """
+    TEMPERATURE = 0.7
+    SCAN_BATCH = 500
+
+    # 同一Redis实例的所有智能体共享连接池
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, host='localhost', port=6379, db=0, cache_ttl=24 * 3600,
+                 serializer='json', compress_threshold=None, max_connections=None,
+                 chain_registry=None):
+        self.chain_registry = chain_registry or default_registry
+        self.host, self.port, self.db = host, port, db
+        self.max_connections = max_connections
+        self.serializer = get_serializer(serializer, compress_threshold)
+        # 连接在首次使用时建立，构造时不再阻塞ping
+        self._client = None
+        self.response_cache = LLMResponseCache(redis_agent=self, ttl=cache_ttl)
+
+    @classmethod
+    def get_pool(cls, host='localhost', port=6379, db=0, max_connections=None):
+        key = (host, port, db)
+        with cls._pools_lock:
+            if key not in cls._pools:
+                cls._pools[key] = redis.ConnectionPool(host=host, port=port, db=db,
+                                                       max_connections=max_connections)
+            return cls._pools[key]
+
+    @property
+    def client(self):
+        if self._client is None:
+            pool = self.get_pool(self.host, self.port, self.db, self.max_connections)
+            self._client = redis.Redis(connection_pool=pool)
+        return self._client
 
     def _check_connection(self):
         try:
@@ -29,41 +68,160 @@ class RedisAgent:
         except redis.ConnectionError as e:
             raise Exception(f"Redis connection failed: {str(e)}")
 
-    def store_data(self, key, value):
+    def store_data(self, key, value, ttl=None):
         try:
-            serialized = json.dumps(value)
-            return self.client.set(key, serialized)
+            serialized = self.serializer.dumps(value)
+            with tracing.span('redis.set'):
+                return self.client.set(key, serialized, ex=ttl)
         except (TypeError, redis.RedisError) as e:
             print(f"Data storage error: {e}")
             return False
 
     def retrieve_data(self, key):
         try:
-            data = self.client.get(key)
-            return json.loads(data) if data else None
-        except (json.JSONDecodeError, redis.RedisError) as e:
+            with tracing.span('redis.get'):
+                data = self.client.get(key)
+            return self.serializer.loads(data) if data else None
+        except (ValueError, redis.RedisError) as e:
+            print(f"Data retrieval error: {e}")
+            return None
+
+    def store_many(self, mapping, ttl=None):
+        try:
+            serialized = {key: self.serializer.dumps(value) for key, value in mapping.items()}
+            if not serialized:
+                return True
+            with tracing.span('redis.store_many', keys=len(serialized)):
+                if ttl is None:
+                    return self.client.mset(serialized)
+                # MSET不支持过期时间，改用非事务流水线一次往返提交
+                pipe = self.client.pipeline(transaction=False)
+                for key, data in serialized.items():
+                    pipe.set(key, data, ex=ttl)
+                return all(pipe.execute())
+        except (TypeError, redis.RedisError) as e:
+            print(f"Data storage error: {e}")
+            return False
+
+    def retrieve_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            with tracing.span('redis.mget', keys=len(keys)):
+                values = self.client.mget(keys)
+        except redis.RedisError as e:
+            print(f"Data retrieval error: {e}")
+            return {key: None for key in keys}
+        return {key: self._loads_or_none(data) for key, data in zip(keys, values)}
+
+    def scan_prefix(self, prefix, batch_size=None):
+        # 按批SCAN键并用MGET取值，避免KEYS阻塞服务端
+        batch_size = batch_size or self.SCAN_BATCH
+        batch = []
+        try:
+            for key in self.client.scan_iter(match=f'{prefix}*', count=batch_size):
+                batch.append(key.decode('utf-8') if isinstance(key, bytes) else key)
+                if len(batch) >= batch_size:
+                    yield from self.retrieve_many(batch).items()
+                    batch = []
+            if batch:
+                yield from self.retrieve_many(batch).items()
+        except redis.RedisError as e:
+            print(f"Data retrieval error: {e}")
+
+    def append_list(self, key, values, max_len=None, ttl=None):
+        # RPUSH后裁剪到最近max_len条并刷新过期时间，一次往返完成
+        try:
+            serialized = [self.serializer.dumps(value) for value in values]
+            if not serialized:
+                return True
+            with tracing.span('redis.append_list', items=len(serialized)):
+                pipe = self.client.pipeline(transaction=False)
+                pipe.rpush(key, *serialized)
+                if max_len:
+                    pipe.ltrim(key, -max_len, -1)
+                if ttl:
+                    pipe.expire(key, ttl)
+                return bool(pipe.execute()[0])
+        except (TypeError, redis.RedisError) as e:
+            print(f"Data storage error: {e}")
+            return False
+
+    def list_range(self, key, start=0, end=-1):
+        try:
+            with tracing.span('redis.lrange'):
+                values = self.client.lrange(key, start, end)
+        except redis.RedisError as e:
+            print(f"Data retrieval error: {e}")
+            return []
+        return [self._loads_or_none(data) for data in values]
+
+    def list_length(self, key):
+        try:
+            return self.client.llen(key)
+        except redis.RedisError as e:
+            print(f"Data retrieval error: {e}")
+            return 0
+
+    def trim_list(self, key, start, end=-1):
+        try:
+            return self.client.ltrim(key, start, end)
+        except redis.RedisError as e:
+            print(f"Data storage error: {e}")
+            return False
+
+    def delete_keys(self, *keys):
+        try:
+            return self.client.delete(*keys) if keys else 0
+        except redis.RedisError as e:
+            print(f"Data storage error: {e}")
+            return 0
+
+    def _loads_or_none(self, data):
+        if not data:
+            return None
+        try:
+            return self.serializer.loads(data)
+        except ValueError as e:
             print(f"Data retrieval error: {e}")
             return None
 
     def process_request(self, input_data):
-        from langchain.chains import LLMChain
-        from langchain.prompts import PromptTemplate
-        import os
-        
-        prompt = PromptTemplate.from_template(
-            """基于以下用户输入生成响应：
-            {query}
-            """
-        )
-        
-        llm = OpenAI(
-            temperature=0.7,
-            openai_api_key=os.getenv('OPENAI_API_KEY'),
-            model_name=os.getenv('MODEL_NAME')
+        model_name = os.getenv('MODEL_NAME')
+        result = self.response_cache.get_or_compute(
+            model_name,
+            [{'role': 'user', 'content': input_data['query']}],
+            lambda: self._run_chain(input_data['query'], model_name),
+            **self._cache_params()
         )
-        chain = LLMChain(llm=llm, prompt=prompt)
         return {
             "status": "processed",
             "input": input_data,
-            "result": chain.run(input_data['query'])
-        }
\ No newline at end of file
+            "result": result
+        }
+
+    def process_batch(self, inputs, max_workers=8):
+        # 先查缓存，未命中的输入通过同一条链并发执行
+        model_name = os.getenv('MODEL_NAME')
+        keys = [self.response_cache.make_key(model_name,
+                                             [{'role': 'user', 'content': item['query']}],
+                                             **self._cache_params())
+                for item in inputs]
+        results = [self.response_cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        computed = self.chain_registry.run_batch(
+            self.PROMPT_TEMPLATE, model_name, self.TEMPERATURE,
+            [inputs[i]['query'] for i in pending], max_workers=max_workers
+        )
+        for i, result in zip(pending, computed):
+            self.response_cache.set(keys[i], result)
+            results[i] = result
+        return [{"status": "processed", "input": item, "result": result}
+                for item, result in zip(inputs, results)]
+
+    def _cache_params(self):
+        return {'temperature': self.TEMPERATURE, 'template': self.PROMPT_TEMPLATE}
+
+    def _run_chain(self, query, model_name):
+        return self.chain_registry.run(self.PROMPT_TEMPLATE, model_name, self.TEMPERATURE, query)
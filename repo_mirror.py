@@ -0,0 +1,67 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import time
+from typing import Optional
+
+import tracing
+from agent_cache import CACHE_ROOT, file_lock
+
+
+class MirrorCache:
+    REFRESH_INTERVAL = 300
+    STAMP_FILE = 'zephyr_agent_refreshed'
+
+    def __init__(self, root: Optional[str] = None, refresh_interval: Optional[float] = None):
+        self.root = root or os.getenv('ZEPHYR_AGENT_MIRRORS', os.path.join(CACHE_ROOT, 'mirrors'))
+        self.refresh_interval = self.REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+
+    def mirror_path(self, url: str) -> str:
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', url.rstrip('/').split('/')[-1])
+        if not name.endswith('.git'):
+            name += '.git'
+        return os.path.join(self.root, f'{hashlib.sha1(url.encode()).hexdigest()[:10]}-{name}')
+
+    def ensure(self, url: str) -> str:
+        path = self.mirror_path(url)
+        with file_lock(path + '.lock'):
+            stamp = os.path.join(path, self.STAMP_FILE)
+            if not os.path.isdir(path):
+                tmp_path = path + '.tmp'
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                tracing.run(['git', 'clone', '--mirror', url, tmp_path],
+                            check=True, capture_output=True)
+                # 借用对象的克隆依赖镜像中的对象，禁止镜像自动gc清理
+                tracing.run(['git', 'config', 'gc.auto', '0'], cwd=tmp_path, check=True)
+                os.replace(tmp_path, path)
+            elif time.time() - self._mtime(stamp) > self.refresh_interval:
+                # 增量刷新：只拉取新增对象
+                tracing.run(['git', 'remote', 'update', '--prune'], cwd=path,
+                            check=True, capture_output=True)
+            with open(stamp, 'w'):
+                pass
+        return path
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0
@@ -0,0 +1,97 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import zlib
+
+
+class JsonSerializer:
+    name = 'json'
+
+    def dumps(self, value) -> bytes:
+        return json.dumps(value).encode('utf-8')
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, value) -> bytes:
+        return self._orjson.dumps(value)
+
+    def loads(self, data: bytes):
+        return self._orjson.loads(data)
+
+
+class MsgpackSerializer:
+    name = 'msgpack'
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, value) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes):
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class CompressedSerializer:
+    # 超过阈值的负载用zlib压缩，并加上标记前缀；
+    # JSON文本和完整的msgpack值都不可能以该前缀开头，因此可与未压缩数据共存
+    MARKER = b'Z:'
+
+    def __init__(self, inner, threshold: int = 4096, level: int = 6):
+        self.inner = inner
+        self.name = f'{inner.name}+zlib'
+        self.threshold = threshold
+        self.level = level
+
+    def dumps(self, value) -> bytes:
+        data = self.inner.dumps(value)
+        if len(data) >= self.threshold:
+            return self.MARKER + zlib.compress(data, self.level)
+        return data
+
+    def loads(self, data: bytes):
+        if data[:2] == self.MARKER:
+            try:
+                data = zlib.decompress(data[2:])
+            except zlib.error as e:
+                # 与其他反序列化错误一致，调用方只需处理ValueError
+                raise ValueError(f'corrupt compressed payload: {e}') from e
+        return self.inner.loads(data)
+
+
+SERIALIZERS = {
+    'json': JsonSerializer,
+    'orjson': OrjsonSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+
+def get_serializer(name: str = 'json', compress_threshold=None):
+    serializer = SERIALIZERS[name]()
+    if compress_threshold is not None:
+        serializer = CompressedSerializer(serializer, threshold=compress_threshold)
+    return serializer
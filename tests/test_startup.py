@@ -0,0 +1,48 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 流水线脚本会反复调用CLI，启动时间超出预算即视为回归
+STARTUP_BUDGET = float(os.getenv('CLI_STARTUP_BUDGET', 0.5))
+HEAVY_MODULES = ('requests', 'dotenv', 'redis', 'redis_agent', 'zephyr_agent', 'deepseek_agent')
+
+
+def _run(*args):
+    return subprocess.run([sys.executable] + list(args), cwd=REPO_ROOT,
+                          check=True, capture_output=True, text=True)
+
+
+def test_help_within_startup_budget():
+    # 取多次运行的最小值，排除机器负载带来的抖动
+    samples = []
+    for _ in range(3):
+        start = time.perf_counter()
+        _run('cli.py', 'zephyr', '--help')
+        samples.append(time.perf_counter() - start)
+    assert min(samples) <= STARTUP_BUDGET, \
+        f'cli.py zephyr --help took {min(samples):.3f}s, budget {STARTUP_BUDGET}s'
+
+
+def test_import_skips_agent_dependencies():
+    # 智能体模块及其依赖只在首次路由到时导入
+    output = _run('-c', 'import sys, cli; print(",".join(sorted(set(sys.argv[1:]) & set(sys.modules))))',
+                  *HEAVY_MODULES).stdout.strip()
+    assert output == '', f'imported at startup: {output}'
@@ -0,0 +1,134 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from typing import Dict, Iterable, Optional
+
+import tracing
+from agent_cache import cache_path, load_json, save_json
+
+
+class ToolchainProbe:
+    CACHE_FILE = 'toolchain_probe.json'
+    VERSION_TIMEOUT = 30
+
+    def __init__(self, max_workers: Optional[int] = None, use_cache: bool = True,
+                 cache_file: Optional[str] = None):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.use_cache = use_cache
+        self.cache_file = cache_file or cache_path(self.CACHE_FILE)
+
+    def fingerprint(self) -> str:
+        # PATH目录及site-packages的mtime在安装/卸载工具时会变化，
+        # 连同解释器一起作为缓存键
+        def _stat_dirs(dirs):
+            entries = []
+            for directory in dirs:
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    mtime = None
+                entries.append([directory, mtime])
+            return entries
+
+        path_dirs = [d for d in os.environ.get('PATH', '').split(os.pathsep) if d]
+        site_dirs = [d for d in sys.path if d and os.path.isdir(d)]
+        key = {
+            'path': _stat_dirs(path_dirs),
+            'site': _stat_dirs(site_dirs),
+            'python': sys.executable,
+            'version': sys.version,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def check_tool(self, tool: str) -> bool:
+        # 不在PATH中的工具无需启动子进程
+        executable = shutil.which(tool)
+        if not executable:
+            return False
+        try:
+            tracing.run([executable, '--version'],
+                        capture_output=True,
+                        check=True,
+                        timeout=self.VERSION_TIMEOUT)
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            return False
+
+    def check_package(self, package: str) -> bool:
+        try:
+            metadata.version(package)
+            return True
+        except metadata.PackageNotFoundError:
+            return False
+
+    def probe(self, tools: Iterable[str], packages: Iterable[str] = ()) -> Dict[str, bool]:
+        tools, packages = list(tools), list(packages)
+        fingerprint = self.fingerprint()
+        cached = self._load_cache(fingerprint)
+
+        results = {}
+        pending_tools = []
+        for tool in tools:
+            if f'tool:{tool}' in cached:
+                results[tool] = cached[f'tool:{tool}']
+            else:
+                pending_tools.append(tool)
+
+        if pending_tools:
+            workers = min(self.max_workers, len(pending_tools))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for tool, found in zip(pending_tools, pool.map(tracing.propagate(self.check_tool), pending_tools)):
+                    results[tool] = found
+                    cached[f'tool:{tool}'] = found
+
+        for package in packages:
+            if f'pkg:{package}' not in cached:
+                cached[f'pkg:{package}'] = self.check_package(package)
+            results[package] = cached[f'pkg:{package}']
+
+        self._save_cache(fingerprint, cached)
+        return results
+
+    def invalidate(self):
+        try:
+            os.unlink(self.cache_file)
+        except OSError:
+            pass
+
+    def _load_cache(self, fingerprint: str) -> dict:
+        if not self.use_cache:
+            return {}
+        data = load_json(self.cache_file, {})
+        if data.get('fingerprint') != fingerprint:
+            return {}
+        return dict(data.get('results', {}))
+
+    def _save_cache(self, fingerprint: str, results: dict):
+        if not self.use_cache:
+            return
+        try:
+            save_json(self.cache_file, {'fingerprint': fingerprint, 'results': results})
+        except OSError:
+            # 缓存不可写时不影响检测结果
+            pass
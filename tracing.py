@@ -0,0 +1,252 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+METRIC_PREFIX = 'zephyr_agent'
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_spans: List[dict] = []
+_origin = time.perf_counter()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_ids)
+        self.parent = None
+        self.start = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        record = {
+            'id': self.id,
+            'parent': self.parent,
+            'name': self.name,
+            'thread': threading.current_thread().name,
+            'start': self.start - _origin,
+            'duration': end - self.start,
+            'attrs': self.attrs,
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        with _lock:
+            _spans.append(record)
+        return False
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, **attrs):
+    # 未开启--profile时返回共享的空对象，几乎没有开销
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def current():
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def propagate(fn):
+    # 线程池中的span默认没有父节点；提交任务时用它包装函数，沿用提交方当前的span
+    parent = current() if _enabled else None
+    if parent is None:
+        return fn
+
+    def _with_parent(*args, **kwargs):
+        stack = _stack()
+        stack.append(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stack.pop()
+    return _with_parent
+
+
+class _RusagePopen(subprocess.Popen):
+    # 用wait4代替waitpid，拿到该子进程自身的CPU时间和峰值内存
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, sts, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            self.rusage = rusage
+        return pid, sts
+
+
+def popen(*popenargs, **kwargs) -> subprocess.Popen:
+    # 需要流式读取输出时使用，结束后配合record_rusage记录资源占用
+    if _enabled and hasattr(os, 'wait4'):
+        return _RusagePopen(*popenargs, **kwargs)
+    return subprocess.Popen(*popenargs, **kwargs)
+
+
+def record_rusage(current, process):
+    rusage = getattr(process, 'rusage', None)
+    if rusage is not None:
+        # Linux下ru_maxrss单位为KB，macOS为字节
+        scale = 1 if sys.platform == 'darwin' else 1024
+        current.set(cpu_user=rusage.ru_utime, cpu_system=rusage.ru_stime,
+                    peak_rss_bytes=rusage.ru_maxrss * scale)
+
+
+def run(*popenargs, input=None, capture_output=False, timeout=None, check=False, **kwargs):
+    # subprocess.run的替代品，开启追踪时额外记录墙钟时间、CPU时间和峰值RSS
+    if not _enabled:
+        return subprocess.run(*popenargs, input=input, capture_output=capture_output,
+                              timeout=timeout, check=check, **kwargs)
+    if capture_output:
+        kwargs['stdout'] = subprocess.PIPE
+        kwargs['stderr'] = subprocess.PIPE
+    args = popenargs[0] if popenargs else kwargs.get('args')
+    with span('subprocess', cmd=command_name(args)) as current:
+        with popen(*popenargs, **kwargs) as process:
+            try:
+                stdout, stderr = process.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                raise
+            except BaseException:
+                process.kill()
+                raise
+            retcode = process.poll()
+        current.set(returncode=retcode)
+        record_rusage(current, process)
+    if check and retcode:
+        raise subprocess.CalledProcessError(retcode, process.args, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(process.args, retcode, stdout, stderr)
+
+
+def command_name(args) -> str:
+    if isinstance(args, (list, tuple)):
+        parts = [os.path.basename(str(a)) for a in args[:2]]
+        return ' '.join(parts)
+    return str(args).split(' ')[0]
+
+
+def spans() -> List[dict]:
+    with _lock:
+        return list(_spans)
+
+
+def export_json(path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'pid': os.getpid(), 'argv': sys.argv, 'spans': spans()}, f,
+                  indent=2, ensure_ascii=False)
+
+
+def prometheus_summary() -> str:
+    durations, cpu, rss = {}, {}, {}
+    for record in spans():
+        key = record['name']
+        if record['name'] == 'subprocess':
+            key = f"subprocess:{record['attrs'].get('cmd', '')}"
+            attrs = record['attrs']
+            if 'cpu_user' in attrs:
+                cpu[key] = cpu.get(key, 0.0) + attrs['cpu_user'] + attrs['cpu_system']
+                rss[key] = max(rss.get(key, 0), attrs['peak_rss_bytes'])
+        count, total = durations.get(key, (0, 0.0))
+        durations[key] = (count + 1, total + record['duration'])
+
+    def _label(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    lines = [f'# HELP {METRIC_PREFIX}_span_seconds Wall time spent in traced spans.',
+             f'# TYPE {METRIC_PREFIX}_span_seconds summary']
+    for key, (count, total) in sorted(durations.items()):
+        lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{_label(key)}"}} {count}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{_label(key)}"}} {total:.6f}')
+    lines += [f'# HELP {METRIC_PREFIX}_subprocess_cpu_seconds_total CPU time used by subprocesses.',
+              f'# TYPE {METRIC_PREFIX}_subprocess_cpu_seconds_total counter']
+    for key, value in sorted(cpu.items()):
+        lines.append(f'{METRIC_PREFIX}_subprocess_cpu_seconds_total{{span="{_label(key)}"}} {value:.6f}')
+    lines += [f'# HELP {METRIC_PREFIX}_subprocess_peak_rss_bytes Peak resident set size of subprocesses.',
+              f'# TYPE {METRIC_PREFIX}_subprocess_peak_rss_bytes gauge']
+    for key, value in sorted(rss.items()):
+        lines.append(f'{METRIC_PREFIX}_subprocess_peak_rss_bytes{{span="{_label(key)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def export_prometheus(path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(prometheus_summary())
+
+
+def export(path: str, prometheus_path: Optional[str] = None):
+    export_json(path)
+    export_prometheus(prometheus_path or os.path.splitext(path)[0] + '.prom')
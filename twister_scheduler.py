@@ -0,0 +1,146 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import tracing
+from log_pipeline import LogIndex, run_logged
+
+
+@dataclass
+class ShardResult:
+    index: int
+    outdir: str
+    log_file: str
+    returncode: int = 0
+    tail: List[str] = field(default_factory=list)
+
+    @property
+    def log_index(self) -> LogIndex:
+        return LogIndex(self.log_file)
+
+
+@dataclass
+class TwisterRun:
+    shards: List[ShardResult]
+    report: Optional[str]
+    summary: dict
+
+    @property
+    def failed_shards(self) -> List[ShardResult]:
+        return [s for s in self.shards if s.returncode != 0]
+
+
+class TwisterScheduler:
+    TAIL_LINES = 200
+
+    def __init__(self, project_path: str, output_dir: Optional[str] = None,
+                 shards: Optional[int] = None, extra_args: Optional[List[str]] = None,
+                 echo: bool = True, env: Optional[dict] = None):
+        cpus = os.cpu_count() or 1
+        self.project_path = project_path
+        self.output_dir = output_dir or os.path.join(project_path, 'twister-out')
+        # 默认每个分片至少分到2个核，分片内部再由twister -j并行
+        self.shards = max(1, shards or min(4, cpus // 2))
+        self.jobs_per_shard = max(1, cpus // self.shards)
+        self.extra_args = list(extra_args or [])
+        self.echo = echo
+        self.env = env
+        self._print_lock = threading.Lock()
+
+    def shard_command(self, index: int, test_roots: List[str], platforms: List[str]) -> List[str]:
+        cmd = ['west', 'twister']
+        for root in test_roots:
+            cmd += ['-T', root]
+        for platform in platforms:
+            cmd += ['-p', platform]
+        cmd += ['--outdir', self._shard_dir(index), '--clobber-output']
+        if self.shards > 1:
+            # 由twister自身按确定性规则切分测试集
+            cmd += ['--subset', f'{index + 1}/{self.shards}']
+        if not any(a in ('-j', '--jobs') or a.startswith('--jobs=') for a in self.extra_args):
+            cmd += ['-j', str(self.jobs_per_shard)]
+        return cmd + self.extra_args
+
+    def run(self, test_roots: Optional[List[str]] = None,
+            platforms: Optional[List[str]] = None) -> TwisterRun:
+        test_roots, platforms = list(test_roots or []), list(platforms or [])
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        def _shard(i):
+            return self._run_shard(i, self.shard_command(i, test_roots, platforms))
+
+        with ThreadPoolExecutor(max_workers=self.shards) as pool:
+            results = list(pool.map(tracing.propagate(_shard), range(self.shards)))
+        report, summary = self.merge_reports(results)
+        return TwisterRun(results, report, summary)
+
+    def _shard_dir(self, index: int) -> str:
+        if self.shards == 1:
+            return self.output_dir
+        return os.path.join(self.output_dir, f'shard-{index + 1}')
+
+    def _run_shard(self, index: int, cmd: List[str]) -> ShardResult:
+        outdir = self._shard_dir(index)
+        log_file = os.path.join(self.output_dir, f'shard-{index + 1}.log')
+        prefix = f'[{index + 1}/{self.shards}] ' if self.shards > 1 else ''
+
+        def echo(line):
+            with self._print_lock:
+                sys.stdout.write(prefix + line)
+                sys.stdout.flush()
+
+        # 逐行写盘并建立错误索引，不在内存中缓存完整日志
+        with tracing.span('twister.shard', index=index + 1, shards=self.shards):
+            run = run_logged(cmd, log_file, cwd=self.project_path, env=self.env,
+                             echo=echo if self.echo else None, check=False,
+                             tail_lines=self.TAIL_LINES)
+        return ShardResult(index, outdir, log_file, run.returncode, run.tail)
+
+    def merge_reports(self, results: List[ShardResult]):
+        merged = None
+        for result in results:
+            path = os.path.join(result.outdir, 'twister.json')
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if merged is None:
+                merged = {'environment': data.get('environment', {}), 'testsuites': []}
+            merged['testsuites'].extend(data.get('testsuites', []))
+
+        if merged is None:
+            return None, {}
+
+        summary = {}
+        for suite in merged['testsuites']:
+            status = suite.get('status', 'unknown')
+            summary[status] = summary.get(status, 0) + 1
+        summary['total'] = len(merged['testsuites'])
+        merged['summary'] = summary
+
+        report = os.path.join(self.output_dir, 'twister.json')
+        if self.shards > 1:
+            with open(report, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, indent=2)
+        return report, summary
@@ -0,0 +1,138 @@
+"""
+Copyright 2025 NXP
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import contextlib
+import os
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+import tracing
+from agent_cache import file_lock, is_locked, load_json, save_json
+
+
+class WorktreePool:
+    STATE_FILE = 'pool.json'
+    PIN_SUFFIX = '.pin'
+    DEFAULT_SIZE = 4
+
+    _lock = threading.Lock()
+
+    def __init__(self, repo_path: str, root: Optional[str] = None,
+                 max_size: int = DEFAULT_SIZE):
+        self.repo_path = os.path.abspath(repo_path)
+        # 默认放在仓库同级目录，仍处于west工作区内，可复用已下载的模块
+        self.root = root or os.path.join(os.path.dirname(self.repo_path), '.zephyr_worktrees',
+                                         os.path.basename(self.repo_path))
+        self.max_size = max(1, max_size)
+        self.state_file = os.path.join(self.root, self.STATE_FILE)
+
+    def _git(self, *args, cwd=None):
+        return tracing.run(['git'] + list(args), cwd=cwd or self.repo_path,
+                           check=True, capture_output=True, text=True).stdout.strip()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # 线程锁 + 文件锁，允许多个进程同时操作同一个池
+        with self._lock, file_lock(os.path.join(self.root, '.lock')):
+            yield
+
+    @classmethod
+    def is_worktree(cls, path: str) -> bool:
+        return os.path.isfile(os.path.abspath(path) + cls.PIN_SUFFIX)
+
+    @classmethod
+    @contextlib.contextmanager
+    def pin(cls, path: str):
+        # 在工作树中编译/测试期间持有共享锁，其他进程淘汰时会跳过该工作树
+        pin_file = os.path.abspath(path) + cls.PIN_SUFFIX
+        if not os.path.isfile(pin_file):
+            yield
+            return
+        with file_lock(pin_file, shared=True):
+            yield
+
+    def _is_pinned(self, pr_number: int) -> bool:
+        return is_locked(self.path_for(pr_number) + self.PIN_SUFFIX)
+
+    def path_for(self, pr_number: int) -> str:
+        return os.path.join(self.root, f'pr-{pr_number}')
+
+    def acquire(self, pr_number: int, refresh: bool = False) -> str:
+        with self._locked():
+            state = load_json(self.state_file, {})
+            path = self.path_for(pr_number)
+            key = str(pr_number)
+            cached = key in state and os.path.isdir(path)
+
+            # 最近使用过的PR直接复用已有工作树，无需任何git操作
+            if not cached or refresh:
+                ref = self.fetch(pr_number)
+                if cached:
+                    self._git('checkout', '--detach', '--force', ref, cwd=path)
+                else:
+                    if os.path.isdir(path):
+                        self._git('worktree', 'remove', '--force', path)
+                    self._git('worktree', 'prune')
+                    self._git('worktree', 'add', '--detach', '--force', path, ref)
+                    open(path + self.PIN_SUFFIX, 'a').close()
+
+            state[key] = {'path': path, 'last_used': time.time()}
+            self._evict(state, keep=key)
+            save_json(self.state_file, state)
+            return path
+
+    def fetch(self, pr_number: int) -> str:
+        # 拉取到refs/pr/N而非本地分支，避免与工作树中已检出的分支冲突；
+        # 工作树共享主仓库的对象库，不能使用--depth，否则主检出会永久变为浅克隆
+        ref = f'refs/pr/{pr_number}'
+        self._git('fetch', '--no-tags', 'origin', f'+pull/{pr_number}/head:{ref}')
+        return ref
+
+    def release(self, pr_number: int):
+        with self._locked():
+            state = load_json(self.state_file, {})
+            if state.pop(str(pr_number), None) is not None:
+                self._remove(pr_number)
+                save_json(self.state_file, state)
+
+    def entries(self) -> List[dict]:
+        state = load_json(self.state_file, {})
+        return sorted(({'pr': int(k), **v} for k, v in state.items()),
+                      key=lambda e: e['last_used'], reverse=True)
+
+    def _evict(self, state: dict, keep: str):
+        # LRU淘汰：超出容量时移除最久未使用的工作树；正在编译/测试的工作树跳过，
+        # 此时池可以暂时超出容量
+        candidates = sorted((k for k in state if k != keep and not self._is_pinned(int(k))),
+                            key=lambda k: state[k]['last_used'])
+        while len(state) > self.max_size and candidates:
+            oldest = candidates.pop(0)
+            del state[oldest]
+            self._remove(int(oldest))
+
+    def _remove(self, pr_number: int):
+        path = self.path_for(pr_number)
+        try:
+            if os.path.isdir(path):
+                self._git('worktree', 'remove', '--force', path)
+            self._git('update-ref', '-d', f'refs/pr/{pr_number}')
+        except subprocess.CalledProcessError:
+            pass
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + self.PIN_SUFFIX)
+        self._git('worktree', 'prune')
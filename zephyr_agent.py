@@ -16,8 +16,21 @@ limitations under the License.
 
 import subprocess
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+import tracing
+from agent_cache import cache_path
+from build_cache import BuildCache
+from toolchain_probe import ToolchainProbe
+from twister_scheduler import TwisterScheduler
+from impact_analysis import ImpactAnalyzer
+from worktree_pool import WorktreePool
+from repo_mirror import MirrorCache
+from manifest_fingerprint import ManifestFingerprint
+from log_pipeline import echo_stdout, run_logged
+
 class ZephyrAgent:
     COMMAND_MAP = {
         'init': ['init'],
@@ -26,9 +39,11 @@ class ZephyrAgent:
         'compile': ['compile'],
         'test': ['test']
     }
+    BUILD_ERROR_CATEGORIES = {'compiler', 'linker', 'cmake', 'devicetree', 'build'}
 
     def __init__(self, project_path: str = '.'):
         self.project_path = os.path.abspath(project_path)
+        self.probe = ToolchainProbe()
 
     def handle_command(self, params):
         command_type = params[0] if params else 'help'
@@ -53,10 +68,10 @@ class ZephyrAgent:
     def check_environment(self) -> bool:
         required_tools = ['cmake', 'ninja', 'dtc', 'west', 'gcc', 'python3-dev', 'twister']
         required_python = ['pytest']
-        missing = [tool for tool in required_tools 
-                  if not self._check_tool_installed(tool)]
-        missing += [pkg for pkg in required_python 
-                  if not self._check_python_package(pkg)]
+        # 并发检测工具并复用磁盘缓存，工具链未变化时直接命中
+        found = self.probe.probe(required_tools, required_python)
+        missing = [name for name in required_tools + required_python
+                  if not found[name]]
         if missing:
             print(_('cli.error.missing_tools').format(missing=', '.join(missing)))
             return False
@@ -64,92 +79,190 @@ class ZephyrAgent:
 
     # 新增Python包检测逻辑和测试方法
     def _check_python_package(self, package: str) -> bool:
-        try:
-            subprocess.run(['python', '-m', 'pip', 'show', package],
-                          stdout=subprocess.DEVNULL,
-                          stderr=subprocess.DEVNULL,
-                          check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return self.probe.check_package(package)
 
-    def run_twister_tests(self, args: str = ''):
-        try:
-            cmd = ['west', 'twister']
-            if args:
-                cmd.extend(args.split())
-            subprocess.run(cmd,
-                         cwd=self.project_path,
-                         check=True,
-                         capture_output=True)
-        except subprocess.CalledProcessError as e:
-            error_msg = _('cli.error.test_failure').format(error=e.stderr.decode())
-            if 'No tests found' in error_msg:
+    def select_impacted_tests(self, base_ref: Optional[str] = None, test_roots=None):
+        # None表示无法缩小范围，需要运行全部指定的测试
+        affected = ImpactAnalyzer(self.project_path).affected_suites(base_ref)
+        if affected is None or not test_roots:
+            return affected
+        # -T可以是相对当前目录或绝对路径，统一转换为相对仓库根目录后再比较
+        roots = [os.path.relpath(os.path.abspath(root), self.project_path).replace(os.sep, '/')
+                 for root in test_roots]
+        roots = ['' if root == '.' else root.rstrip('/') + '/' for root in roots]
+        return [s for s in affected if any((s + '/').startswith(r) for r in roots)]
+
+    def run_twister_tests(self, args: str = '', platforms=None, test_roots=None,
+                          shards: Optional[int] = None, impact: bool = False,
+                          base_ref: Optional[str] = None):
+        if impact:
+            selected = self.select_impacted_tests(base_ref, test_roots)
+            if selected is not None:
+                if not selected:
+                    return None
+                test_roots = selected
+        scheduler = TwisterScheduler(self.project_path,
+                                     shards=shards,
+                                     extra_args=args.split() if args else [],
+                                     env=self.command_env())
+        # 测试期间固定工作树，防止其他进程淘汰
+        with WorktreePool.pin(self.project_path):
+            run = scheduler.run(test_roots, platforms)
+        if run.failed_shards:
+            # 根据流式建立的错误索引分类，只取相关片段而非整个日志
+            indexes = [shard.log_index for shard in run.failed_shards]
+            categories = {category for index in indexes for category, _severity in index.summary()}
+            context = '\n'.join(filter(None, (index.context_for_llm(max_chars=2000) for index in indexes)))
+            if 'no_tests' in categories:
                 raise RuntimeError(_('cli.error.no_tests_found'))
-            elif 'build error' in error_msg.lower():
-                raise RuntimeError(_('cli.error.compile_failed'))
-            raise RuntimeError(error_msg)
+            elif categories & self.BUILD_ERROR_CATEGORIES:
+                raise RuntimeError(_('cli.error.compile_failed').format(error=context))
+            raise RuntimeError(_('cli.error.test_failure').format(
+                error=context or ''.join(line for shard in run.failed_shards for line in shard.tail)))
+        return run
 
-    def clone_repo(self, repo_url: str):
-        try:
-            subprocess.run(['git', 'clone', '--recursive', repo_url, self.project_path],
-                          check=True,
-                          capture_output=True)
-        except subprocess.CalledProcessError as e:
-            error_output = e.stderr.decode()
-            if 'fatal: not a git repository' in error_output:
-                raise RuntimeError(_('cli.error.init_first'))
-            elif 'Could not resolve host' in error_output:
-                raise RuntimeError(_('cli.error.network_issue'))
-            raise RuntimeError(_('cli.error.repo_clone_failed').format(error=error_output))
-
-    def switch_pr(self, pr_number: int):
-        try:
-            subprocess.run(['git', 'fetch', 'origin', f'pull/{pr_number}/head:pr-{pr_number}'],
-                          cwd=self.project_path,
-                          check=True,
-                          capture_output=True)
-            subprocess.run(['git', 'checkout', f'pr-{pr_number}'],
-                          cwd=self.project_path,
-                          check=True)
-        except subprocess.CalledProcessError as e:
-            error_output = e.stderr.decode()
-            if 'invalid refspec' in error_output:
-                raise RuntimeError(_('cli.error.invalid_pr').format(number=pr_number))
-            elif 'pathspec' in error_output:
-                raise RuntimeError(_('cli.error.uncommitted_changes'))
-            raise RuntimeError(_('cli.error.pr_switch_failed').format(error=error_output))
+    def command_env(self, base: Optional[dict] = None) -> dict:
+        env = dict(os.environ if base is None else base)
+        # PR工作树不执行west update，模块来自主工作区；工作树本身是zephyr仓库时，
+        # 让west build/twister使用工作树中的源码而非主检出的zephyr.base
+        if (WorktreePool.is_worktree(self.project_path)
+                and os.path.isfile(os.path.join(self.project_path, 'zephyr', 'module.yml'))):
+            env['ZEPHYR_BASE'] = os.path.abspath(self.project_path)
+        return env
 
     def _check_tool_installed(self, tool: str) -> bool:
-        try:
-            subprocess.run([tool, '--version'],
-                          capture_output=True,
-                          check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        return self.probe.check_tool(tool)
 
     def setup_environment(self):
         if not self.check_environment():
             # 安装必要依赖
-            subprocess.run(['pip', 'install', 'west'], check=True)
-            subprocess.run(['west', 'update'], check=True)
-
-    def clone_repo(self, repo_url: str):
-        subprocess.run(['git', 'clone', repo_url, self.project_path], 
-                      check=True)
-
-    def switch_pr(self, pr_number: int):
-        subprocess.run(['git', 'fetch', 'origin', f'pull/{pr_number}/head:pr-{pr_number}'],
-                      cwd=self.project_path,
-                      check=True)
-        subprocess.run(['git', 'checkout', f'pr-{pr_number}'],
-                      cwd=self.project_path,
-                      check=True)
-        subprocess.run(['west', 'update'], check=True)
-
-    def compile_project(self, board: str = 'native_posix'):
-        build_dir = os.path.join(self.project_path, 'build')
-        subprocess.run(['west', 'build', '-b', board, '.'],
-                      cwd=self.project_path,
-                      check=True)
\ No newline at end of file
+            tracing.run(['pip', 'install', 'west'], check=True)
+            self.probe.invalidate()
+            self.west_update()
+
+    def west_update(self, force: bool = False, jobs: Optional[int] = None):
+        try:
+            fingerprint = ManifestFingerprint(self.project_path)
+            projects = None if force else fingerprint.plan()
+        except (subprocess.CalledProcessError, OSError):
+            fingerprint, projects = None, None
+
+        # 清单解析结果与各项目检出版本均未变化，跳过更新
+        if projects == []:
+            return []
+
+        base_cmd = ['west', 'update']
+        name_cache = os.getenv('ZEPHYR_AGENT_WEST_CACHE')
+        if name_cache and os.path.isdir(name_cache):
+            # 共享的裸仓库对象缓存，按项目名查找
+            base_cmd += ['--name-cache', name_cache]
+        if projects is None:
+            tracing.run(base_cmd, cwd=self.project_path, check=True)
+        else:
+            # 只更新版本有变化的项目，按批并行执行
+            workers = max(1, min(len(projects), jobs or os.cpu_count() or 1))
+            batches = [projects[i::workers] for i in range(workers)]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                run = tracing.propagate(tracing.run)
+                for future in [pool.submit(run, base_cmd + batch, cwd=self.project_path, check=True)
+                               for batch in batches]:
+                    future.result()
+
+        if fingerprint is None:
+            try:
+                fingerprint = ManifestFingerprint(self.project_path)
+            except (subprocess.CalledProcessError, OSError):
+                return projects
+        fingerprint.record()
+        return projects
+
+    def clone_repo(self, repo_url: str, mirror: bool = True, partial: bool = False,
+                   depth: Optional[int] = None, jobs: Optional[int] = None):
+        cmd = ['git', 'clone', '--recurse-submodules', f'--jobs={jobs or os.cpu_count() or 1}']
+        if mirror:
+            # 从本地镜像借用对象，只需从远端拉取镜像中缺少的部分
+            try:
+                cmd += ['--reference-if-able', MirrorCache().ensure(repo_url)]
+            except (subprocess.CalledProcessError, OSError):
+                pass
+        if partial:
+            cmd.append('--filter=blob:none')
+        if depth:
+            cmd += ['--depth', str(depth), '--shallow-submodules']
+        log_file = cache_path('logs', 'clone-{}.log'.format(os.path.basename(os.path.abspath(self.project_path))))
+        try:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        except OSError:
+            # 缓存目录不可写时日志写到临时目录
+            log_file = os.path.join(tempfile.gettempdir(), os.path.basename(log_file))
+        run_logged(cmd + [repo_url, self.project_path], log_file, echo=echo_stdout)
+
+    def switch_pr(self, pr_number: int, worktree: bool = False, refresh: bool = False,
+                  pool_size: int = WorktreePool.DEFAULT_SIZE, full_update: bool = False):
+        if worktree:
+            # 每个PR独立的工作树和构建目录，之后的编译/测试都在该目录进行
+            pool = WorktreePool(self.project_path, max_size=pool_size)
+            self.project_path = pool.acquire(pr_number, refresh=refresh)
+            return self.project_path
+        tracing.run(['git', 'fetch', 'origin', f'pull/{pr_number}/head:pr-{pr_number}'],
+                    cwd=self.project_path,
+                    check=True)
+        tracing.run(['git', 'checkout', f'pr-{pr_number}'],
+                    cwd=self.project_path,
+                    check=True)
+        self.west_update(force=full_update)
+        return self.project_path
+
+    def compile_project(self, board: str = 'native_posix', conf_files=None,
+                        jobs: Optional[int] = None, force: bool = False, log_file=None):
+        cache = BuildCache(self.project_path)
+        build_dir = cache.build_dir(board, conf_files)
+        key = cache.key(board, conf_files)
+        # 板型、配置片段和源码树均未变化时直接复用上次的构建结果
+        if not force and cache.is_fresh(build_dir, key):
+            return build_dir
+
+        cmd = ['west', 'build', '-b', board, '-d', build_dir]
+        if jobs:
+            cmd.append(f'-o=-j{jobs}')
+        cmd.append('.')
+        cmake_args = cache.ccache_args()
+        if conf_files:
+            cmake_args.append('-DEXTRA_CONF_FILE={}'.format(';'.join(conf_files)))
+        if cmake_args:
+            cmd += ['--'] + cmake_args
+
+        # 未指定日志文件时写入构建目录并同时输出到终端
+        echo = echo_stdout if log_file is None else None
+        log_file = log_file or os.path.join(build_dir, 'build.log')
+        # 构建期间固定工作树，防止其他进程淘汰
+        with WorktreePool.pin(self.project_path):
+            run_logged(cmd, log_file, cwd=self.project_path,
+                       env=self.command_env(cache.build_env()), echo=echo)
+        cache.mark(build_dir, key)
+        return build_dir
+
+    def compile_boards(self, boards, conf_files=None, jobs: Optional[int] = None,
+                       max_parallel: Optional[int] = None, force: bool = False):
+        # 总并行度在同时构建的板型之间平均分配，避免过量订阅CPU
+        total_jobs = jobs or os.cpu_count() or 1
+        parallel = max(1, min(len(boards), max_parallel or len(boards)))
+        jobs_per_build = max(1, total_jobs // parallel)
+        cache = BuildCache(self.project_path)
+
+        def _build(board):
+            log_file = os.path.join(cache.build_dir(board, conf_files), 'build.log')
+            try:
+                return self.compile_project(board, conf_files, jobs_per_build, force, log_file)
+            except subprocess.CalledProcessError:
+                raise RuntimeError(_('cli.error.board_build_failed').format(board=board, log=log_file))
+
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            futures = {board: pool.submit(tracing.propagate(_build), board) for board in boards}
+        results = {}
+        for board, future in futures.items():
+            try:
+                results[board] = future.result()
+            except RuntimeError as e:
+                results[board] = e
+        return results